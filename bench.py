@@ -0,0 +1,1364 @@
+import argparse
+import time
+
+from tictactoe.engine import Board, geometry
+
+
+def bench_solver(args):
+    from tictactoe.engine.solver import Solver
+
+    solver = Solver()
+    for run in ("cold", "warm"):
+        print(f"--- {run}")
+        board = Board()
+        while not board.is_over():
+            nodes = solver.nodes
+            start = time.perf_counter()
+            move, score = solver.solve(board)
+            elapsed = time.perf_counter() - start
+            print(f"ход {move}  оценка {score:+d}  узлов {solver.nodes - nodes:6d}  {elapsed * 1000:8.3f} мс")
+            board = board.play(move)
+        print(f"позиций в таблице: {len(solver.table)}")
+
+
+def bench_book(args):
+    from tictactoe.engine import book
+
+    start = time.perf_counter()
+    book.load()
+    print(f"загрузка книги: {(time.perf_counter() - start) * 1000:.3f} мс")
+
+    positions = []
+    board = Board()
+    while not board.is_over():
+        positions.append(board)
+        board = board.play(book.best_move(board))
+
+    rounds = 10000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for board in positions:
+            book.lookup(board)
+    elapsed = time.perf_counter() - start
+    print(f"поиск хода: {elapsed / (rounds * len(positions)) * 1e6:.3f} мкс")
+
+
+def bench_mcts(args):
+    from tictactoe.engine.mcts import MctsPlayer
+
+    for budget in args.budgets:
+        player = MctsPlayer(budget, seed=1)
+        board = Board(size=args.size, k=args.k)
+        print(f"--- {args.size}x{args.size}, {board.k} в ряд, бюджет {budget * 1000:.0f} мс")
+        for _ in range(args.moves):
+            if board.is_over():
+                break
+            move = player.choose_move(board)
+            reused = player.root.visits - player.playouts
+            print(
+                f"ход {move:4d}  плейаутов {player.playouts:7d}  "
+                f"из прошлого дерева {reused:7d}  {player.playouts_per_second:9.0f} в секунду"
+            )
+            board = board.play(move)
+
+
+def bench_parallel(args):
+    import os
+
+    from tictactoe.engine import parallel
+
+    board = Board(size=args.size, k=args.k)
+    for move in (board.cells // 2, board.cells // 2 + 1, board.cells // 2 + board.size):
+        board = board.play(move)
+
+    baseline = None
+    for workers in range(1, (args.workers or os.cpu_count() or 1) + 1):
+        player = parallel.ParallelMctsPlayer(args.budget, workers)
+        player.choose_move(board)  # прогрев пула
+        playouts = 0
+        elapsed = 0.0
+        for _ in range(args.rounds):
+            player.choose_move(board)
+            playouts += player.playouts
+            elapsed += player.elapsed
+        rate = playouts / elapsed
+        baseline = baseline or rate
+        print(f"процессов {workers:2d}  плейаутов в секунду {rate:10.0f}  ускорение x{rate / baseline:.2f}")
+    parallel.shutdown()
+
+
+def bench_batch(args):
+    import numpy as np
+
+    from tictactoe.engine import batch
+
+    size = args.size
+    cells = size * size
+    rng = np.random.default_rng(1)
+    # Случайные позиции: первые p клеток случайной перестановки, по очереди X и O
+    order = rng.random((args.positions, cells)).argsort(axis=1)
+    plies = rng.integers(0, cells + 1, args.positions)
+    stones = np.where(np.arange(cells) % 2 == 0, batch.X_STONE, batch.O_STONE).astype(np.int8)
+    boards = np.zeros((args.positions, cells), np.int8)
+    placed = np.arange(cells) < plies[:, None]
+    np.put_along_axis(boards, order, np.where(placed, stones, batch.EMPTY).astype(np.int8), axis=1)
+
+    start = time.perf_counter()
+    outcomes, legal = batch.evaluate(boards, args.k)
+    vector_time = time.perf_counter() - start
+
+    powers = 1 << np.arange(cells, dtype=np.int64)
+    x_masks = ((boards == batch.X_STONE) @ powers).tolist()
+    o_masks = ((boards == batch.O_STONE) @ powers).tolist()
+    start = time.perf_counter()
+    scalar = [batch.outcome(Board(x, o, size, args.k)) for x, o in zip(x_masks, o_masks)]
+    scalar_time = time.perf_counter() - start
+
+    mismatches = int((outcomes != np.array(scalar, np.uint8)).sum())
+    print(f"позиций: {args.positions}, расхождений: {mismatches}")
+    print(f"NumPy:  {vector_time:8.3f} с  {args.positions / vector_time:12.0f} позиций/с")
+    print(f"Python: {scalar_time:8.3f} с  {args.positions / scalar_time:12.0f} позиций/с")
+    print(f"ускорение x{scalar_time / vector_time:.1f}")
+
+
+def bench_protocol(args):
+    import asyncio
+    import random
+
+    from tictactoe import protocol
+
+    rng = random.Random(1)
+
+    def expected_move(seq):
+        return seq % 15, seq * 7 % 15
+
+    # Поток кадров режется на куски случайной длины: кадры и склеиваются, и разрываются
+    stream = b"".join(protocol.encode_move(seq, *expected_move(seq)) for seq in range(1, args.moves + 1))
+    decoder = protocol.FrameDecoder()
+    frames = []
+    offset = 0
+    while offset < len(stream):
+        step = rng.randint(1, 64)
+        frames += decoder.feed(stream[offset:offset + step])
+        offset += step
+    broken = sum(
+        1
+        for seq, frame in enumerate(frames, 1)
+        if frame.seq != seq or protocol.decode_move(frame.payload)[:2] != expected_move(seq)
+    )
+    print(f"нарезка в памяти: кадров {len(frames)}/{args.moves}, ошибок {broken}")
+
+    async def run():
+        received = []
+        errors = [0]
+        done = asyncio.Event()
+
+        async def handle(reader, writer):
+            decoder = protocol.FrameDecoder()
+            while len(received) < args.moves:
+                data = await reader.read(rng.randint(1, 4096))
+                if not data:
+                    break
+                for frame in decoder.feed(data):
+                    seq = len(received) + 1
+                    if frame.seq != seq or protocol.decode_move(frame.payload)[:2] != expected_move(seq):
+                        errors[0] += 1
+                    received.append(frame.seq)
+            done.set()
+            writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+        start = time.perf_counter()
+        offset = 0
+        while offset < len(stream):
+            step = rng.randint(1, 256)
+            writer.write(stream[offset:offset + step])
+            offset += step
+            if offset % 16 == 0:
+                await writer.drain()
+        await writer.drain()
+        await done.wait()
+        elapsed = time.perf_counter() - start
+
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        print(
+            f"loopback: кадров {len(received)}/{args.moves}, рассинхронизаций {errors[0]}, "
+            f"{len(received) / elapsed:.0f} ходов/с"
+        )
+
+    asyncio.run(run())
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def bench_server(args):
+    import asyncio
+    import random
+
+    from tictactoe import protocol, server
+
+    async def player(port, latencies, finished, seed):
+        rng = random.Random(seed)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        decoder = protocol.FrameDecoder()
+        seq = 0
+        for _ in range(args.rounds):
+            seq += 1
+            writer.write(protocol.encode_join(seq, args.size, geometry(args.size, args.k).k))
+            role = board = pending = None
+            sent_at = 0.0
+            over = False
+            while not over:
+                data = await reader.read(4096)
+                if not data:
+                    writer.close()
+                    return
+                for frame in decoder.feed(data):
+                    if frame.type == protocol.START:
+                        role, size, k = protocol.decode_start(frame.payload)
+                        board = Board(size=size, k=k)
+                    elif frame.type == protocol.MOVE:
+                        row, col, _ = protocol.decode_move(frame.payload)
+                        board = board.play(row * board.size + col)
+                        if pending == (row, col):
+                            latencies.append(time.perf_counter() - sent_at)
+                            pending = None
+                    elif frame.type == protocol.SYNC:
+                        board = protocol.decode_sync(frame.payload)
+                        pending = None
+                    elif frame.type == protocol.RESIGN:
+                        over = True
+                if board is not None and board.is_over():
+                    over = True
+                if not over and role is not None and pending is None and board.turn == role:
+                    move = rng.choice(board.moves())
+                    pending = divmod(move, board.size)
+                    seq += 1
+                    sent_at = time.perf_counter()
+                    writer.write(protocol.encode_move(seq, *pending, board.play(move).zobrist))
+            finished[0] += 1
+        writer.close()
+
+    async def run():
+        game_server, listener = await server.serve("127.0.0.1", args.port)
+        port = listener.sockets[0].getsockname()[1]
+        latencies = []
+        finished = [0]
+        start = time.perf_counter()
+        await asyncio.gather(*(player(port, latencies, finished, seed) for seed in range(args.players)))
+        elapsed = time.perf_counter() - start
+        listener.close()
+        await listener.wait_closed()
+
+        matches = finished[0] // 2
+        print(f"игроков {args.players}, партий {matches}, ходов {len(latencies)}, {elapsed:.2f} с")
+        print(f"партий в секунду: {matches / elapsed:.0f}")
+        print(
+            f"задержка хода: p50 {percentile(latencies, 0.5) * 1000:.2f} мс, "
+            f"p99 {percentile(latencies, 0.99) * 1000:.2f} мс"
+        )
+
+    asyncio.run(run())
+
+
+def bench_reconnect(args):
+    import asyncio
+    import random
+
+    from tictactoe import protocol, record, server
+
+    class Client:
+        def __init__(self):
+            self.decoder = protocol.FrameDecoder()
+            self.board = Board()
+            self.moves = 0
+            self.seq = 0
+            self.role = self.token = None
+            self.resigned = False
+            self.ended = None
+
+        async def connect(self, port):
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+            self.decoder = protocol.FrameDecoder()
+
+        def send(self, encode, *args):
+            self.seq += 1
+            self.writer.write(encode(self.seq, *args))
+
+        async def wait(self, condition):
+            while not condition():
+                data = await self.reader.read(4096)
+                if not data:
+                    raise ConnectionError("Сервер закрыл соединение")
+                for frame in self.decoder.feed(data):
+                    if frame.type == protocol.START:
+                        self.role = protocol.decode_start(frame.payload)[0]
+                    elif frame.type == protocol.SESSION:
+                        self.token = protocol.decode_session(frame.payload)
+                    elif frame.type == protocol.MOVE:
+                        row, col, _ = protocol.decode_move(frame.payload)
+                        self.board = self.board.play(row * self.board.size + col)
+                        self.moves += 1
+                    elif frame.type == protocol.SYNC:
+                        self.board = protocol.decode_sync(frame.payload)
+                        self.moves = self.board.occupied.bit_count()
+                    elif frame.type == protocol.RESIGN:
+                        self.resigned = True
+                    elif frame.type == protocol.ENDED:
+                        self.ended = protocol.decode_ended(frame.payload)
+
+    async def run():
+        game_server, listener = await server.serve("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        rng = random.Random(1)
+        timings = []
+        diverged = 0
+        wrong_results = 0
+
+        for _ in range(args.games):
+            first, second = Client(), Client()
+            for client in (first, second):
+                await client.connect(port)
+                client.send(protocol.encode_join, 3, 3)
+            for client in (first, second):
+                await client.wait(lambda client=client: client.token is not None)
+            players = {client.role: client for client in (first, second)}
+            match, _ = game_server.sessions[first.token]
+
+            async def play_one():
+                board = players["X"].board
+                mover = players[board.turn]
+                target = mover.moves + 1
+                move = rng.choice(board.moves())
+                mover.send(protocol.encode_move, *divmod(move, 3), board.play(move).zobrist)
+                for client in players.values():
+                    await client.wait(lambda client=client: client.moves >= target)
+
+            await play_one()
+            await play_one()
+
+            # Обрываем соединение того, кто сейчас не ходит, и соперник ходит без него
+            other = players[players["X"].board.turn]
+            victim = first if other is second else second
+            victim.writer.transport.abort()
+            await asyncio.sleep(0.01)
+            move = rng.choice(other.board.moves())
+            other.send(protocol.encode_move, *divmod(move, 3), other.board.play(move).zobrist)
+            await other.wait(lambda: other.moves >= 3)
+
+            start = time.perf_counter()
+            await victim.connect(port)
+            victim.send(protocol.encode_resume, victim.token, 0, victim.moves)
+            await victim.wait(lambda: victim.moves >= 3)
+            timings.append(time.perf_counter() - start)
+
+            if victim.board != match.board or other.board != match.board:
+                diverged += 1
+
+            # Второй обрыв не успевает вернуться: поражение засчитывается, а опоздавший с токеном
+            # должен узнать победу соперника, а не свою
+            victim.writer.transport.abort()
+            await asyncio.sleep(0.01)
+            game_server.forfeit(match, victim.role)
+            await other.wait(lambda: other.resigned)
+            await victim.connect(port)
+            victim.send(protocol.encode_resume, victim.token, 0, victim.moves)
+            await victim.wait(lambda: victim.ended is not None)
+            if victim.ended != (record.O_WINS if victim.role == "X" else record.X_WINS):
+                wrong_results += 1
+            for client in (first, second):
+                client.writer.close()
+            await asyncio.sleep(0)
+
+        listener.close()
+        await listener.wait_closed()
+        print(f"партий с обрывом: {args.games}, расхождений доски: {diverged}, неверных итогов после поражения: {wrong_results}")
+        print(
+            f"переподключение и досылка ходов: p50 {percentile(timings, 0.5) * 1000:.2f} мс, "
+            f"p99 {percentile(timings, 0.99) * 1000:.2f} мс"
+        )
+        if diverged or wrong_results:
+            raise SystemExit("Сервер: доски разошлись или итог после переподключения неверен")
+
+    asyncio.run(run())
+    if args.gui_games:
+        reconnect_gui(args.gui_games)
+
+
+# То же через сетевой код GUI (offscreen): сервер крутится в своём потоке, клиенты переподключаются сами
+# (handle_connection_lost, задержка в connect_to_host), а хост досылает ходы через resume_peer
+def reconnect_gui(games):
+    import asyncio
+    import os
+    import random
+    import re
+    import socket
+    import threading
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+
+    from tictactoe import gui, server
+
+    app = QApplication.instance() or QApplication([])
+    rng = random.Random(1)
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    async def call(function, *args):
+        return function(*args)
+
+    # Состояние сервера читается и меняется только в его потоке
+    def on_server(function, *args):
+        return asyncio.run_coroutine_threadsafe(call(function, *args), loop).result()
+
+    def pump(condition, timeout=5.0):
+        deadline = time.perf_counter() + timeout
+        while not condition():
+            if time.perf_counter() > deadline:
+                return False
+            app.processEvents()
+            time.sleep(0.001)
+        return True
+
+    def require(condition, what):
+        if not pump(condition):
+            raise SystemExit(f"GUI: не дождались: {what}")
+
+    def network(address):
+        menu = gui.MainMenu()
+        manager = gui.NetworkManager(menu)
+        manager.connection_progress.disconnect()
+        manager.progress = []
+        manager.connection_progress.connect(manager.progress.append)
+        manager.address = address
+        menu.game_window = gui.GameWindow("network", manager)
+        return manager
+
+    def window(manager):
+        return manager.parent.game_window
+
+    def close(*managers):
+        for manager in managers:
+            manager.disconnect()
+            window(manager).close()
+            window(manager).deleteLater()
+            manager.parent.deleteLater()
+        app.processEvents()
+
+    # Ход кликом за того, чья очередь; ждём, пока ход увидят оба
+    def play(managers, count):
+        for _ in range(count):
+            board = window(managers["X"]).game
+            move = rng.choice(board.moves())
+            window(managers[board.turn]).make_move(*divmod(move, board.size))
+            target = board.play(move)
+            require(lambda: all(window(manager).game == target for manager in managers.values()), "ход соперника")
+
+    # Переподключение с нарастающей задержкой: порт никто не слушает
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        dead = probe.getsockname()
+    lonely = network(dead)
+    lonely.connect_to_host()
+    require(lambda: lonely.reconnect_delay > 4 * lonely.RECONNECT_DELAY, "повторов подключения")
+    delays = [int(delay) for delay in re.findall(r"повтор через (\d+) мс", " ".join(lonely.progress))]
+    close(lonely)
+    expected_delays = [lonely.RECONNECT_DELAY << attempt for attempt in range(3)]
+    if delays[:3] != expected_delays:
+        raise SystemExit(f"GUI: задержки переподключения {delays}, ожидались {expected_delays}")
+
+    game_server, listener = asyncio.run_coroutine_threadsafe(server.serve("127.0.0.1", 0), loop).result()
+    address = listener.sockets[0].getsockname()[:2]
+    diverged = wrong_results = 0
+    timings = []
+
+    for _ in range(games):
+        # Клиенты сервера: обрыв у того, кто не ходит, соперник ходит без него
+        first, second = network(address), network(address)
+        for manager in (first, second):
+            manager.connect_to_host()
+        require(lambda: first.token is not None and second.token is not None, "начала партии на сервере")
+        managers = {first.role: first, second.role: second}
+        match, _ = on_server(game_server.sessions.get, first.token)
+        play(managers, 2)
+        other = managers[window(first).game.turn]
+        victim = first if other is second else second
+        start = time.perf_counter()
+        victim.client.abort()
+        play({victim.role: other, other.role: other}, 1)
+        if pump(lambda: window(victim).game == window(other).game == on_server(lambda: match.board)):
+            timings.append(time.perf_counter() - start)
+        else:
+            diverged += 1
+        if victim.reconnect_delay != victim.RECONNECT_DELAY:
+            raise SystemExit("GUI: задержка не сбросилась после подключения")
+
+        # Поражение за неявку, затем возвращение с устаревшим токеном: оба видят победу соперника
+        victim.closing = True
+        victim.client.abort()
+        on_server(game_server.forfeit, match, victim.role)
+        require(lambda: "победил" in window(other).winner_label.text(), "поражения за неявку")
+        victim.closing = False
+        victim.connect_to_host()
+        require(lambda: victim.token is None, "ответа на устаревший токен")
+        winner = f"Игрок {other.role} победил!"
+        if window(victim).winner_label.text() != winner or window(other).winner_label.text() != winner:
+            wrong_results += 1
+        close(first, second)
+
+        # Хост и клиент напрямую: хост (O) ходит, пока клиент переподключается
+        host = network(None)
+        host.host_game()
+        peer = network(("127.0.0.1", host.server.serverPort()))
+        peer.connect_to_host()
+        require(lambda: peer.token is not None and peer.role is not None, "начала партии у хоста")
+        managers = {host.role: host, peer.role: peer}
+        play(managers, 3)
+        start = time.perf_counter()
+        peer.client.abort()
+        play({"X": host, "O": host}, 1)
+        if pump(lambda: window(peer).game == window(host).game):
+            timings.append(time.perf_counter() - start)
+        else:
+            diverged += 1
+
+        # Токен чужой сессии: хост отвечает, что партии нет, и клиент не объявляет себя победителем
+        peer.closing = True
+        peer.client.abort()
+        peer.token = os.urandom(len(host.token))
+        peer.closing = False
+        peer.connect_to_host()
+        require(lambda: peer.token is None, "ответа хоста на чужой токен")
+        if window(peer).winner_label.text() != "Партия уже закончена":
+            wrong_results += 1
+        close(peer, host)
+
+    listener.close()
+    loop.call_soon_threadsafe(loop.stop)
+    print(
+        f"GUI: партий с обрывом {2 * games}, расхождений доски: {diverged}, неверных итогов: {wrong_results}, "
+        f"задержки повторов {expected_delays} мс"
+    )
+    print(
+        f"GUI: обрыв, переподключение и досылка: p50 {percentile(timings, 0.5) * 1000:.2f} мс, "
+        f"p99 {percentile(timings, 0.99) * 1000:.2f} мс"
+    )
+    if diverged or wrong_results:
+        raise SystemExit("GUI: доски разошлись или итог после переподключения неверен")
+
+
+def bench_spectators(args):
+    import asyncio
+    import random
+
+    from tictactoe import protocol, server
+
+    class Listener(asyncio.Protocol):
+        def __init__(self):
+            self.decoder = protocol.FrameDecoder()
+            self.arrivals = []
+            self.synced = False
+            self.changed = None
+
+        def connection_made(self, transport):
+            self.transport = transport
+
+        def data_received(self, data):
+            now = time.perf_counter()
+            for frame in self.decoder.feed(data):
+                if frame.type == protocol.MOVE:
+                    self.arrivals.append(now)
+                elif frame.type == protocol.SYNC:
+                    self.synced = True
+            if self.changed is not None:
+                self.changed()
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        game_server, listener = await server.serve("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+
+        async def connect():
+            _, client = await loop.create_connection(Listener, "127.0.0.1", port)
+            return client
+
+        players = [await connect(), await connect()]
+        for player in players:
+            player.transport.write(protocol.encode_join(1, args.size, geometry(args.size).k))
+        while not game_server.matches:
+            await asyncio.sleep(0.001)
+        match = next(iter(game_server.matches.values()))
+
+        spectators = [await connect() for _ in range(args.spectators)]
+        for spectator in spectators:
+            spectator.transport.write(protocol.encode_watch(1, match.id))
+        while not all(spectator.synced for spectator in spectators):
+            await asyncio.sleep(0.001)
+
+        # Соединение сервера -> наш клиент: у сервера и клиента свои объекты, сопоставляем по адресу
+        by_address = {player.transport.get_extra_info("sockname"): player for player in players}
+        by_role = {
+            role: by_address[connection.transport.get_extra_info("peername")]
+            for role, connection in match.players.items()
+        }
+
+        rng = random.Random(1)
+        latencies = []
+        fanout = []
+        board = match.board
+        for number in range(args.moves):
+            if board.is_over():
+                break
+            mover = by_role[board.turn]
+            move = rng.choice(board.moves())
+            board = board.play(move)
+            done = asyncio.Event()
+            waiting = [len(spectators)]
+
+            def changed(spectator):
+                if len(spectator.arrivals) == number + 1:
+                    waiting[0] -= 1
+                    if not waiting[0]:
+                        done.set()
+
+            for spectator in spectators:
+                spectator.changed = lambda spectator=spectator: changed(spectator)
+            sent = time.perf_counter()
+            mover.transport.write(protocol.encode_move(number + 2, *divmod(move, board.size), board.zobrist))
+            await done.wait()
+            arrivals = [spectator.arrivals[number] - sent for spectator in spectators]
+            latencies += arrivals
+            fanout.append(max(arrivals))
+
+        listener.close()
+        for connection in players + spectators:
+            connection.transport.close()
+        await listener.wait_closed()
+        print(f"зрителей {len(spectators)}, ходов {len(fanout)}")
+        print(
+            f"доставка хода зрителю: p50 {percentile(latencies, 0.5) * 1000:.2f} мс, "
+            f"p99 {percentile(latencies, 0.99) * 1000:.2f} мс"
+        )
+        print(
+            f"ход получили все зрители: p50 {percentile(fanout, 0.5) * 1000:.2f} мс, "
+            f"p99 {percentile(fanout, 0.99) * 1000:.2f} мс"
+        )
+
+    asyncio.run(run())
+
+
+def bench_record(args):
+    import os
+    import random
+    import tempfile
+
+    from tictactoe import record
+
+    rng = random.Random(1)
+    cells = args.size * args.size
+    games = []
+    for _ in range(args.games):
+        board = Board(size=args.size, k=args.k)
+        order = rng.sample(range(cells), cells)
+        played = []
+        for index in order:
+            if board.is_over():
+                break
+            board = board.play(index)
+            played.append(index)
+        games.append((record.board_result(board), played))
+    k = geometry(args.size, args.k).k
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "games.xog")
+        start = time.perf_counter()
+        with record.GameWriter(path) as writer:
+            for result, played in games:
+                writer.append(args.size, k, result, played)
+        write_time = time.perf_counter() - start
+        file_size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        mismatches = 0
+        for game, (result, played) in zip(record.read_games(path), games):
+            if game.result != result or list(game.moves) != played:
+                mismatches += 1
+        read_time = time.perf_counter() - start
+
+        with record.GameArchive(path) as archive:
+            picks = [rng.randrange(len(archive)) for _ in range(args.lookups)]
+            start = time.perf_counter()
+            for number in picks:
+                if list(archive[number].moves) != games[number][1]:
+                    mismatches += 1
+            lookup_time = time.perf_counter() - start
+
+    print(f"партий: {args.games}, доска {args.size}x{args.size}, расхождений: {mismatches}")
+    print(f"размер: {file_size} байт, {file_size / args.games:.1f} байт на партию")
+    print(f"запись:  {args.games / write_time:12.0f} партий/с")
+    print(f"чтение:  {args.games / read_time:12.0f} партий/с")
+    print(f"по индексу: {args.lookups / lookup_time:12.0f} партий/с")
+
+
+def bench_difficulty(args):
+    from tictactoe.engine import X, evaluation, players
+
+    evaluation.shared.clear()
+    print(f"доска {args.size}x{args.size}, партий на уровень: {args.games}, соперник: {args.opponent}")
+    for difficulty in players.DIFFICULTIES:
+        tier = players.for_difficulty(difficulty, args.budget, blunder_rate=args.blunder_rate, seed=1)
+        opponent = players.create(args.opponent, args.budget, seed=2)
+        results = {"win": 0, "draw": 0, "loss": 0}
+        moves = 0
+        spent = 0.0
+        before = evaluation.stats()
+        for game in range(args.games):
+            # Уровень ходит первым в чётных партиях
+            tier_side = X if game % 2 == 0 else "O"
+            board = Board(size=args.size, k=args.k)
+            while not board.is_over():
+                if board.turn == tier_side:
+                    start = time.perf_counter()
+                    move = tier.choose_move(board)
+                    spent += time.perf_counter() - start
+                    moves += 1
+                else:
+                    move = opponent.choose_move(board)
+                board = board.play(move)
+            winner = board.winner()
+            results["draw" if winner is None else "win" if winner == tier_side else "loss"] += 1
+        after = evaluation.stats()
+        print(
+            f"{difficulty:>10}: побед {results['win']:5d}  ничьих {results['draw']:5d}  поражений {results['loss']:5d}  "
+            f"{spent * 1000 / max(moves, 1):8.3f} мс/ход  кэш: попаданий {after['hits'] - before['hits']}, "
+            f"промахов {after['misses'] - before['misses']}"
+        )
+    stats = evaluation.stats()
+    print(
+        f"кэш оценок: попаданий {stats['hits']}, промахов {stats['misses']}, "
+        f"доля попаданий {stats['hit_rate']:.1%}, записей {stats['size']}/{stats['maxsize']}"
+    )
+
+
+def bench_tablebase(args):
+    import os
+    import random
+
+    from tictactoe.engine import tablebase
+    from tictactoe.engine.mcts import MctsPlayer
+
+    path = args.path or tablebase.path_for(args.size, args.k)
+    if args.rebuild:
+        for name in (path, path + ".ckpt"):
+            if os.path.exists(name):
+                os.remove(name)
+    result = tablebase.build(args.size, args.k, path, args.workers)
+    if result["chunks"]:
+        print(f"сборка: {result['elapsed']:.1f} с, порций {result['chunks']}, из контрольной точки {result['resumed']}")
+    print(f"файл {os.path.getsize(path) / 1e6:.1f} МБ, позиций {result['positions']}")
+
+    start = time.perf_counter()
+    table = tablebase.Tablebase(path)
+    print(f"открытие: {(time.perf_counter() - start) * 1000:.1f} мс")
+
+    rng = random.Random(1)
+    boards = []
+    while len(boards) < args.positions:
+        board = Board(size=args.size, k=args.k)
+        for _ in range(rng.randrange(board.cells)):
+            if board.is_over():
+                break
+            board = board.play(rng.choice(board.moves()))
+        if not board.is_over():
+            boards.append(board)
+
+    start = time.perf_counter()
+    for board in boards:
+        table.probe(board)
+    print(f"оценка позиции: {(time.perf_counter() - start) / len(boards) * 1e6:.3f} мкс")
+    start = time.perf_counter()
+    for board in boards:
+        table.best_move(board)
+    print(f"лучший ход: {(time.perf_counter() - start) / len(boards) * 1e6:.3f} мкс")
+
+    player = MctsPlayer(args.budget, seed=1)
+    agree = 0
+    for board in boards[:args.mcts]:
+        move = player.choose_move(board)
+        player.reset()
+        best = table.best_move(board)
+        agree += table.probe(board.play(move))[0] == table.probe(board.play(best))[0]
+    print(f"MCTS ({args.budget * 1000:.0f} мс) сохраняет исход в {agree}/{args.mcts} позиций")
+    table.close()
+
+
+def bench_matchmaking(args):
+    import heapq
+    import os
+    import random
+    import statistics
+    import tempfile
+
+    from tictactoe import matchmaking
+
+    rng = random.Random(1)
+    skills = [rng.gauss(matchmaking.DEFAULT_RATING, 300) for _ in range(args.players)]
+
+    # 1. Поток игроков в виртуальном времени: приходят за --arrival секунд, после партии встают в очередь снова
+    matchmaker = matchmaking.Matchmaker()
+    ratings = matchmaker.ratings
+    arrivals = [(rng.uniform(0, args.arrival), player) for player in range(args.players)]
+    heapq.heapify(arrivals)
+    played = [0] * args.players
+    added = {}
+    latencies = []
+    waits = []
+    gaps = []
+    peak = 0
+    now = 0.0
+    next_tick = args.tick
+
+    def finish(first, second):
+        a, b = int(first.player), int(second.player)
+        waits.extend((now - added[a], now - added[b]))
+        gaps.append(abs(first.rating - second.rating))
+        score = 1.0 if rng.random() < matchmaking.expected(skills[a], skills[b]) else 0.0
+        ratings.report(first.player, second.player, score)
+        for player in (a, b):
+            played[player] += 1
+            if played[player] < args.games:
+                heapq.heappush(arrivals, (now + args.game_time, player))
+
+    while arrivals or len(matchmaker):
+        if arrivals and arrivals[0][0] < next_tick:
+            now, player = heapq.heappop(arrivals)
+            added[player] = now
+            start = time.perf_counter()
+            opponent = matchmaker.add((3, 3), str(player), now=now)
+            latencies.append(time.perf_counter() - start)
+            if opponent is not None:
+                finish(opponent, matchmaking.Ticket(str(player), ratings.rating(str(player)), now, 0))
+            peak = max(peak, len(matchmaker))
+            continue
+        now = next_tick
+        next_tick += args.tick
+        for _, first, second in matchmaker.tick(now):
+            finish(first, second)
+        if not arrivals and now > args.arrival + args.game_time + matchmaking.MAX_WINDOW / matchmaking.WIDEN_RATE:
+            break
+    print(
+        f"поток: игроков {args.players}, постановок в очередь {len(latencies)}, пар {len(gaps)}, "
+        f"без соперника {len(matchmaker)}, пик очереди {peak}"
+    )
+    print(
+        f"  постановка с поиском пары: p50 {percentile(latencies, 0.5) * 1e6:.2f} мкс, "
+        f"p99 {percentile(latencies, 0.99) * 1e6:.2f} мкс, {len(latencies) / sum(latencies):.0f} в секунду"
+    )
+    print(
+        f"  ожидание p99 {percentile(waits, 0.99):.2f} с (виртуальных), "
+        f"разница рейтингов: средняя {statistics.mean(gaps):.1f}, p99 {percentile(gaps, 0.99):.0f}"
+    )
+    values = [ratings.rating(str(player)) for player in range(args.players)]
+    print(f"  корреляция рейтинга с настоящей силой после {args.games} партий: {statistics.correlation(values, skills):.3f}")
+
+    # 2. Все игроки в очереди сразу: нулевое начальное окно, пары появляются только по мере расширения окон
+    queue = matchmaking.MatchQueue(base=0)
+    start = time.perf_counter()
+    for player, skill in enumerate(skills):
+        queue.add(player, skill, now=0.0)
+    elapsed = time.perf_counter() - start
+    print(f"очередь из {len(queue)}: постановка {elapsed / args.players * 1e6:.2f} мкс на игрока")
+    now = 0.0
+    ticks = []
+    paired = 0
+    while len(queue) > 1 and now < matchmaking.MAX_WINDOW / matchmaking.WIDEN_RATE + 1:
+        now += args.tick
+        start = time.perf_counter()
+        paired += len(queue.tick(now))
+        ticks.append(time.perf_counter() - start)
+    print(
+        f"  пар {paired} за {now:.1f} виртуальных с; проверка окон: p50 {percentile(ticks, 0.5) * 1000:.2f} мс, "
+        f"max {max(ticks) * 1000:.2f} мс, {paired / sum(ticks):.0f} пар в секунду"
+    )
+
+    # 3. Рейтинги: пачки против отдельной транзакции на каждую партию
+    with tempfile.TemporaryDirectory() as directory:
+        for name, result_batch, write_batch, games in (
+            ("пачками", matchmaking.RESULT_BATCH, matchmaking.WRITE_BATCH, args.rated),
+            ("по одной", 1, 1, args.single),
+        ):
+            store = matchmaking.Ratings(os.path.join(directory, f"{result_batch}.sqlite3"), result_batch, write_batch)
+            start = time.perf_counter()
+            for _ in range(games):
+                first, second = rng.sample(range(args.players), 2)
+                store.report(str(first), str(second), rng.choice((0.0, 0.5, 1.0)))
+            store.close()
+            elapsed = time.perf_counter() - start
+            print(f"рейтинги {name}: {games / elapsed:.0f} партий/с, транзакций {store.writes}")
+
+
+def bench_patterns(args):
+    import numpy as np
+
+    from tictactoe.engine import X, patterns, players
+
+    evaluator = patterns.Evaluator(args.size, args.k)
+    rng = np.random.default_rng(1)
+    cells = evaluator.cells
+    # Случайные позиции: первые p клеток случайной перестановки заняты поочерёдно X и O
+    order = rng.random((args.positions, cells)).argsort(axis=1)
+    plies = rng.integers(0, cells // 2, args.positions)
+    stones = np.where(np.arange(cells) % 2 == 0, 1, 2).astype(np.int8)
+    boards = np.zeros((args.positions, cells), np.int8)
+    filled = np.arange(cells) < plies[:, None]
+    np.put_along_axis(boards, order, np.where(filled, stones, 0).astype(np.int8), axis=1)
+    print(f"доска {args.size}x{args.size}, {evaluator.k} в ряд, линий {len(evaluator.lines)}")
+
+    start = time.perf_counter()
+    evaluator.score(boards)
+    elapsed = time.perf_counter() - start
+    print(f"пакетом: {args.positions / elapsed:.0f} позиций/с")
+
+    single = boards[:args.single]
+    start = time.perf_counter()
+    for row in single:
+        evaluator.score(row[None, :])
+    elapsed = time.perf_counter() - start
+    print(f"по одной: {len(single) / elapsed:.0f} позиций/с")
+
+    parents = []
+    for row in boards[:args.parents]:
+        x = sum(1 << int(cell) for cell in np.flatnonzero(row == 1))
+        o = sum(1 << int(cell) for cell in np.flatnonzero(row == 2))
+        parents.append(Board(x, o, args.size, evaluator.k))
+    children = 0
+    start = time.perf_counter()
+    for board in parents:
+        moves = board.moves()
+        evaluator.score_children(board, moves)
+        children += len(moves)
+    elapsed = time.perf_counter() - start
+    print(f"все ходы из позиции (как на горизонте поиска): {children / elapsed:.0f} позиций/с")
+
+    start = time.perf_counter()
+    positions, targets = patterns.selfplay(evaluator, args.games, rng=rng)
+    played = time.perf_counter() - start
+    start = time.perf_counter()
+    loss, used = patterns.fit(evaluator, positions, targets)
+    print(
+        f"игра с собой: {args.games} партий, {len(positions)} позиций за {played:.1f} с; "
+        f"обучение на {used} за {time.perf_counter() - start:.2f} с, ошибка {loss:.3f}"
+    )
+
+    results = {"win": 0, "draw": 0, "loss": 0}
+    spent = {"patterns": 0.0, "shallow": 0.0}
+    moves = {"patterns": 0, "shallow": 0}
+    for game in range(args.match):
+        agents = {"patterns": players.create("patterns", seed=game), "shallow": players.create("shallow", seed=game)}
+        side = X if game % 2 == 0 else "O"
+        board = Board(size=args.match_size, k=args.k)
+        while not board.is_over():
+            name = "patterns" if board.turn == side else "shallow"
+            start = time.perf_counter()
+            move = agents[name].choose_move(board)
+            spent[name] += time.perf_counter() - start
+            moves[name] += 1
+            board = board.play(move)
+        winner = board.winner()
+        results["draw" if winner is None else "win" if winner == side else "loss"] += 1
+    print(
+        f"patterns против shallow (глубина {players.SHALLOW_DEPTH}, {args.match_size}x{args.match_size}): "
+        f"побед {results['win']}, ничьих {results['draw']}, поражений {results['loss']}; "
+        f"ход {spent['patterns'] * 1000 / max(moves['patterns'], 1):.1f} мс против "
+        f"{spent['shallow'] * 1000 / max(moves['shallow'], 1):.1f} мс"
+    )
+
+
+def bench_deepening(args):
+    from tictactoe.engine import X, players
+    from tictactoe.engine.deepening import DeepeningPlayer
+
+    print(f"доска {args.size}x{args.size}, {args.k} в ряд, соперник: {args.opponent}, партий на бюджет: {args.games}")
+    DeepeningPlayer(args.budgets[0]).choose_move(Board(size=args.size, k=args.k))  # загрузка весов оценки
+    for budget in args.budgets:
+        results = {"win": 0, "draw": 0, "loss": 0}
+        depths = []
+        times = []
+        nodes = 0
+        for game in range(args.games):
+            player = DeepeningPlayer(budget, seed=game)
+            opponent = players.create(args.opponent, budget, seed=game)
+            side = X if game % 2 == 0 else "O"
+            board = Board(size=args.size, k=args.k)
+            while not board.is_over():
+                if board.turn == side:
+                    move = player.choose_move(board)
+                    depths.append(player.depth)
+                    times.append(player.elapsed)
+                    nodes += player.nodes
+                else:
+                    move = opponent.choose_move(board)
+                board = board.play(move)
+            winner = board.winner()
+            results["draw" if winner is None else "win" if winner == side else "loss"] += 1
+        times.sort()
+        print(
+            f"{budget * 1000:6.0f} мс: глубина {sum(depths) / len(depths):.1f} (от {min(depths)} до {max(depths)}), "
+            f"ход {sum(times) * 1000 / len(times):.0f} мс, p99 {times[int(len(times) * 0.99)] * 1000:.0f} мс, "
+            f"макс. {times[-1] * 1000:.0f} мс, узлов/с {nodes / sum(times):.0f}; "
+            f"побед {results['win']}, ничьих {results['draw']}, поражений {results['loss']}"
+        )
+
+
+def bench_evalcache(args):
+    import os
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+
+    from tictactoe import selfplay
+    from tictactoe.engine import evalcache, patterns
+
+    workers = args.workers or os.cpu_count() or 1
+    directory = args.dir or tempfile.mkdtemp()
+    path = evalcache.path_for(args.size, args.k, directory)
+    if os.path.exists(path):
+        os.remove(path)
+    config = {
+        "x": "deepening",
+        "o": "deepening",
+        "size": args.size,
+        "k": args.k,
+        "budget": 0.0,
+        "depth": args.depth,
+        "no_numpy": True,
+        "record": False,
+    }
+    chunk = max(args.games // workers, 1)
+    starts = list(range(0, args.games, chunk))
+    counts = [min(chunk, args.games - start) for start in starts]
+    print(
+        f"доска {args.size}x{args.size}, {args.k} в ряд, deepening на глубину {args.depth} против себя, "
+        f"партий {args.games}, процессов {workers}"
+    )
+    # Тот же набор партий без кэша, с пустым кэшем и ещё раз с заполненным; затем другие партии с тем же кэшем
+    runs = (
+        ("без кэша", None, 0),
+        ("первый прогон", directory, 0),
+        ("второй прогон", directory, 0),
+        ("другие партии", directory, args.games),
+    )
+    for name, cache, seed in runs:
+        run = dict(config, cache=cache, seed=seed)
+        if cache is not None:
+            evalcache.start_run(args.size, args.k, cache)
+        start = time.perf_counter()
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(selfplay.play_games, [run] * len(starts), starts, counts))
+        elapsed = time.perf_counter() - start
+        moves = sum(sum(result[1]) for result in results)
+        line = f"{name:>14}: {elapsed:6.2f} с, ходов {moves}, {moves / elapsed:6.1f} ходов/с"
+        if cache is not None:
+            table = evalcache.EvalCache(path, args.size, args.k, patterns.load(args.size, args.k).fingerprint())
+            line += f", записей в кэше {table.used()}/{table.buckets * evalcache.BUCKET}"
+            table.close()
+        print(line)
+    print(f"файл кэша {os.path.getsize(path) / 1e6:.1f} МБ: {path}")
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return 0.0
+    import os
+
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def bench_board(args):
+    import os
+    import random
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication, QGridLayout, QPushButton, QWidget
+
+    from tictactoe import gui
+
+    app = QApplication.instance() or QApplication([])
+
+    # Прежняя доска: кнопка на каждую клетку - для сравнения
+    def button_grid(size):
+        widget = QWidget()
+        layout = QGridLayout(widget)
+        layout.setSpacing(0)
+        for row in range(size):
+            for col in range(size):
+                button = QPushButton("", widget)
+                button.setFixedSize(gui.GameWindow.CELL_SIZE, gui.GameWindow.CELL_SIZE)
+                button.clicked.connect(lambda _, r=row, c=col: None)
+                layout.addWidget(button, row, col)
+        return widget
+
+    for size in args.sizes:
+        for kind in ("виджет", "кнопки"):
+            app.processEvents()
+            before = rss_mb()
+            start = time.perf_counter()
+            if kind == "виджет":
+                windows = [gui.BoardWidget(Board(size=size), gui.GameWindow.CELL_SIZE) for _ in range(args.windows)]
+            else:
+                windows = [button_grid(size) for _ in range(args.windows)]
+            for window in windows:
+                window.show()
+            app.processEvents()
+            created = (time.perf_counter() - start) / args.windows
+            memory = (rss_mb() - before) / args.windows
+
+            repaint = ""
+            if kind == "виджет":
+                widget = windows[0]
+                board = widget.board
+                spent = []
+                for index in random.Random(size).sample(range(size * size), min(args.moves, size * size)):
+                    # Законченную партию начинаем заново, как в замере архива; очистка доски не замеряется
+                    if board.is_over():
+                        board = Board(size=size)
+                        widget.set_board(board)
+                    start = time.perf_counter()
+                    board = board.play(index)
+                    widget.set_board(board, (index,))
+                    widget.repaint(widget.cell_rect(index))
+                    spent.append(time.perf_counter() - start)
+                repaint = f"  перерисовка хода p50 {percentile(spent, 0.5) * 1000:.3f} мс, p99 {percentile(spent, 0.99) * 1000:.3f} мс"
+            print(f"{size:>3}x{size:<3} {kind:>7}: создание {created * 1000:8.1f} мс  память {memory:7.2f} МБ{repaint}")
+            for window in windows:
+                window.close()
+                window.deleteLater()
+            app.processEvents()
+
+
+def bench_metrics(args):
+    import json
+    import timeit
+
+    from tictactoe import metrics, protocol, server
+    from tictactoe.engine.solver import Solver
+
+    metrics.disable()
+    guard = timeit.timeit("metrics.enabled and time.perf_counter()", globals={"metrics": metrics, "time": time}, number=10 ** 6)
+    print(f"проверка выключенного замера: {guard * 1000:.1f} нс на вызов")
+
+    class Transport:
+        def is_closing(self):
+            return False
+
+        def write(self, data):
+            pass
+
+        def get_write_buffer_size(self):
+            return 0
+
+        def close(self):
+            pass
+
+    # Поток ходов через Connection.data_received и GameServer.move без сети
+    def serve_moves():
+        game_server = server.GameServer()
+        players = [server.Connection(game_server) for _ in range(2)]
+        for connection in players:
+            connection.connection_made(Transport())
+            connection.data_received(protocol.encode_join(1, 15, 5))
+        turn = {player.role: player for player in players}
+        for _ in range(args.games):
+            board = Board(size=15, k=5)
+            for index in range(0, 225, 2)[:8]:
+                board = board.play(index)
+                turn[board.turn == "X" and "O" or "X"].data_received(
+                    protocol.encode_move(1, index // 15, index % 15, board.zobrist)
+                )
+            for connection in players:
+                connection.data_received(protocol.encode(protocol.NEW_GAME, 1))
+            game_server.new_game(players[0])
+            game_server.tick()
+            for connection in players:
+                connection.match.board = Board(size=15, k=5)
+                connection.match.moves = []
+
+    def solve():
+        solver = Solver()
+        for _ in range(args.solves):
+            solver.clear()
+            solver.solve(Board())
+
+    workloads = (("сервер: ходы через data_received", serve_moves), ("solver: перебор с пустой доски", solve))
+    for name, workload in workloads:
+        # Лучшее из нескольких чередующихся прогонов: так меньше шума от соседних процессов
+        times = {False: [], True: []}
+        for _ in range(args.repeat):
+            for state in (False, True):
+                metrics.reset()
+                if state:
+                    metrics.enable()
+                else:
+                    metrics.disable()
+                start = time.perf_counter()
+                workload()
+                times[state].append(time.perf_counter() - start)
+        metrics.disable()
+        off, on = min(times[False]), min(times[True])
+        print(f"{name}: выключено {off * 1000:.1f} мс, включено {on * 1000:.1f} мс (+{(on / off - 1) * 100:.1f}%)")
+
+    metrics.enable()
+    serve_moves()
+    solve()
+    metrics.disable()
+    print(json.dumps(metrics.snapshot(), ensure_ascii=False, indent=1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("solver", help="alpha-beta с таблицей транспозиций").set_defaults(func=bench_solver)
+
+    commands.add_parser("book", help="загрузка и поиск по дебютной книге").set_defaults(func=bench_book)
+
+    mcts_parser = commands.add_parser("mcts", help="плейауты MCTS в секунду")
+    mcts_parser.add_argument("--size", type=int, default=15)
+    mcts_parser.add_argument("--k", type=int, default=None)
+    mcts_parser.add_argument("--moves", type=int, default=6)
+    mcts_parser.add_argument("--budgets", type=float, nargs="+", default=[0.05, 0.5])
+    mcts_parser.set_defaults(func=bench_mcts)
+
+    parallel_parser = commands.add_parser("parallel", help="ускорение MCTS от числа процессов")
+    parallel_parser.add_argument("--size", type=int, default=15)
+    parallel_parser.add_argument("--k", type=int, default=None)
+    parallel_parser.add_argument("--workers", type=int, default=None)
+    parallel_parser.add_argument("--budget", type=float, default=0.5)
+    parallel_parser.add_argument("--rounds", type=int, default=3)
+    parallel_parser.set_defaults(func=bench_parallel)
+
+    batch_parser = commands.add_parser("batch", help="пакетная проверка позиций NumPy против Board.winner()")
+    batch_parser.add_argument("--positions", type=int, default=10 ** 6)
+    batch_parser.add_argument("--size", type=int, default=3)
+    batch_parser.add_argument("--k", type=int, default=None)
+    batch_parser.set_defaults(func=bench_batch)
+
+    protocol_parser = commands.add_parser("protocol", help="нагрузочная проверка кадров протокола через loopback")
+    protocol_parser.add_argument("--moves", type=int, default=100000)
+    protocol_parser.set_defaults(func=bench_protocol)
+
+    server_parser = commands.add_parser("server", help="нагрузочный тест сервера: N игроков через loopback")
+    server_parser.add_argument("--players", type=int, default=1000)
+    server_parser.add_argument("--rounds", type=int, default=5)
+    server_parser.add_argument("--size", type=int, default=3)
+    server_parser.add_argument("--k", type=int, default=None)
+    server_parser.add_argument("--port", type=int, default=0)
+    server_parser.set_defaults(func=bench_server)
+
+    reconnect_parser = commands.add_parser("reconnect", help="обрыв соединения посреди партии и возобновление сессии")
+    reconnect_parser.add_argument("--games", type=int, default=200)
+    reconnect_parser.add_argument("--gui-games", type=int, default=20, help="партий через сетевой код GUI (offscreen), 0 - без них")
+    reconnect_parser.set_defaults(func=bench_reconnect)
+
+    spectators_parser = commands.add_parser("spectators", help="рассылка ходов зрителям через loopback")
+    spectators_parser.add_argument("--spectators", type=int, default=1000)
+    spectators_parser.add_argument("--moves", type=int, default=40)
+    spectators_parser.add_argument("--size", type=int, default=19)
+    spectators_parser.set_defaults(func=bench_spectators)
+
+    record_parser = commands.add_parser("record", help="запись и чтение архива партий")
+    record_parser.add_argument("--games", type=int, default=200000)
+    record_parser.add_argument("--size", type=int, default=3)
+    record_parser.add_argument("--k", type=int, default=None)
+    record_parser.add_argument("--lookups", type=int, default=100000)
+    record_parser.set_defaults(func=bench_record)
+
+    difficulty_parser = commands.add_parser("difficulty", help="уровни сложности ИИ против одного соперника")
+    difficulty_parser.add_argument("--games", type=int, default=1000)
+    difficulty_parser.add_argument("--size", type=int, default=3)
+    difficulty_parser.add_argument("--k", type=int, default=None)
+    difficulty_parser.add_argument("--opponent", choices=("random", "book", "mcts", "shallow"), default="random")
+    difficulty_parser.add_argument("--blunder-rate", type=float, default=0.2)
+    difficulty_parser.add_argument("--budget", type=float, default=0.05)
+    difficulty_parser.set_defaults(func=bench_difficulty)
+
+    board_parser = commands.add_parser("board", help="создание, память и перерисовка доски в GUI (offscreen)")
+    board_parser.add_argument("--sizes", type=int, nargs="+", default=[3, 15, 50])
+    board_parser.add_argument("--windows", type=int, default=5)
+    board_parser.add_argument("--moves", type=int, default=200)
+    board_parser.set_defaults(func=bench_board)
+
+    metrics_parser = commands.add_parser("metrics", help="цена замеров: выключенные против включённых")
+    metrics_parser.add_argument("--games", type=int, default=2000)
+    metrics_parser.add_argument("--solves", type=int, default=20)
+    metrics_parser.add_argument("--repeat", type=int, default=5, help="прогонов каждого режима")
+    metrics_parser.set_defaults(func=bench_metrics)
+
+    tablebase_parser = commands.add_parser("tablebase", help="сборка таблицы эндшпиля, размер и время поиска")
+    tablebase_parser.add_argument("--size", type=int, default=4)
+    tablebase_parser.add_argument("--k", type=int, default=4)
+    tablebase_parser.add_argument("--path", default=None)
+    tablebase_parser.add_argument("--workers", type=int, default=None)
+    tablebase_parser.add_argument("--rebuild", action="store_true", help="собрать заново, даже если файл есть")
+    tablebase_parser.add_argument("--positions", type=int, default=100000)
+    tablebase_parser.add_argument("--mcts", type=int, default=20, help="позиций для сравнения с MCTS")
+    tablebase_parser.add_argument("--budget", type=float, default=0.05)
+    tablebase_parser.set_defaults(func=bench_tablebase)
+
+    matchmaking_parser = commands.add_parser("matchmaking", help="подбор соперников и рейтинги Эло на виртуальных игроках")
+    matchmaking_parser.add_argument("--players", type=int, default=100000)
+    matchmaking_parser.add_argument("--games", type=int, default=3, help="партий на игрока")
+    matchmaking_parser.add_argument("--arrival", type=float, default=60.0, help="за сколько виртуальных секунд приходят игроки")
+    matchmaking_parser.add_argument("--game-time", type=float, default=20.0, help="длина партии в виртуальных секундах")
+    matchmaking_parser.add_argument("--tick", type=float, default=0.5)
+    matchmaking_parser.add_argument("--rated", type=int, default=100000, help="партий для замера рейтингов пачками")
+    matchmaking_parser.add_argument("--single", type=int, default=2000, help="партий для сравнения без пачек")
+    matchmaking_parser.set_defaults(func=bench_matchmaking)
+
+    patterns_parser = commands.add_parser("patterns", help="оценка позиций по линиям: позиций в секунду, обучение, сила")
+    patterns_parser.add_argument("--size", type=int, default=15)
+    patterns_parser.add_argument("--k", type=int, default=5)
+    patterns_parser.add_argument("--positions", type=int, default=100000)
+    patterns_parser.add_argument("--single", type=int, default=2000, help="позиций для замера по одной")
+    patterns_parser.add_argument("--parents", type=int, default=200, help="позиций для оценки всех ходов из них")
+    patterns_parser.add_argument("--games", type=int, default=256, help="партий игры с собой для обучения")
+    patterns_parser.add_argument("--match", type=int, default=10, help="партий patterns против shallow")
+    patterns_parser.add_argument("--match-size", type=int, default=9)
+    patterns_parser.set_defaults(func=bench_patterns)
+
+    deepening_parser = commands.add_parser("deepening", help="итеративное углубление: глубина и время на ход по бюджетам")
+    deepening_parser.add_argument("--size", type=int, default=15)
+    deepening_parser.add_argument("--k", type=int, default=5)
+    deepening_parser.add_argument("--budgets", type=float, nargs="+", default=[0.05, 0.2, 1.0])
+    deepening_parser.add_argument("--games", type=int, default=4, help="партий на каждый бюджет")
+    deepening_parser.add_argument("--opponent", choices=("random", "shallow", "patterns", "mcts"), default="patterns")
+    deepening_parser.set_defaults(func=bench_deepening)
+
+    evalcache_parser = commands.add_parser("evalcache", help="кэш оценок на диске: первый и второй прогон игры с собой")
+    evalcache_parser.add_argument("--size", type=int, default=15)
+    evalcache_parser.add_argument("--k", type=int, default=5)
+    evalcache_parser.add_argument("--depth", type=int, default=3)
+    evalcache_parser.add_argument("--games", type=int, default=16)
+    evalcache_parser.add_argument("--workers", type=int, default=None)
+    evalcache_parser.add_argument("--dir", help="каталог для файла кэша (по умолчанию временный)")
+    evalcache_parser.set_defaults(func=bench_evalcache)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
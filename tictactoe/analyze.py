@@ -0,0 +1,170 @@
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import record
+from .engine import CELLS, SIZE, Board, book, solver
+
+OPTIMAL = 0
+INACCURACY = 1
+BLUNDER = 2
+TAGS = ("optimal", "inaccuracy", "blunder")
+
+ENGINES = ("solver", "book")
+
+# Оценки ходов по позиции (x, o); позиции повторяются из партии в партию, поэтому кэш общий на процесс
+_caches = {engine: {} for engine in ENGINES}
+
+
+def sign(value):
+    return (value > 0) - (value < 0)
+
+
+# Лучший ход - optimal; худший, но с тем же исходом (медленнее выигрыш, быстрее проигрыш) - inaccuracy;
+# ход, меняющий исход к худшему - blunder
+def classify(values):
+    best = max(values.values())
+    tags = {}
+    for move, value in values.items():
+        if value == best:
+            tags[move] = OPTIMAL
+        elif sign(value) == sign(best):
+            tags[move] = INACCURACY
+        else:
+            tags[move] = BLUNDER
+    return tags
+
+
+def move_tags(x, o, engine):
+    cache = _caches[engine]
+    tags = cache.get((x, o))
+    if tags is None:
+        board = Board(x, o)
+        if board.is_over():
+            tags = {}
+        else:
+            tags = classify(solver.move_values(board) if engine == "solver" else book.move_values(board))
+        cache[(x, o)] = tags
+    return tags
+
+
+def empty_stats():
+    return {
+        "games": 0,
+        "skipped": 0,
+        "invalid": 0,
+        "results": [0, 0, 0, 0],
+        "sides": [[0, 0, 0], [0, 0, 0]],
+        "plies": [[0, 0, 0] for _ in range(CELLS)],
+        "clean": 0,
+    }
+
+
+def analyze_range(path, start, stop, engine):
+    stats = empty_stats()
+    sides = stats["sides"]
+    plies = stats["plies"]
+    with record.GameArchive(path) as archive:
+        for number in range(start, stop):
+            game = archive[number]
+            if game.size != SIZE or game.k != SIZE:
+                stats["skipped"] += 1
+                continue
+            x = o = 0
+            tagged = []
+            for ply, move in enumerate(game.moves):
+                bit = 1 << move
+                tags = move_tags(x, o, engine)
+                tag = tags.get(move)
+                if tag is None:
+                    break
+                tagged.append(tag)
+                if ply & 1:
+                    o |= bit
+                else:
+                    x |= bit
+            else:
+                stats["games"] += 1
+                stats["results"][game.result] += 1
+                for ply, tag in enumerate(tagged):
+                    sides[ply & 1][tag] += 1
+                    plies[ply][tag] += 1
+                if BLUNDER not in tagged:
+                    stats["clean"] += 1
+                continue
+            # Ход в занятую клетку или после конца партии
+            stats["invalid"] += 1
+    return stats
+
+
+def merge(total, stats):
+    for key in ("games", "skipped", "invalid", "clean"):
+        total[key] += stats[key]
+    for i, count in enumerate(stats["results"]):
+        total["results"][i] += count
+    for table in ("sides", "plies"):
+        for row, counts in zip(total[table], stats[table]):
+            for i, count in enumerate(counts):
+                row[i] += count
+
+
+def report(stats, elapsed, file=None):
+    games = stats["games"]
+    print(
+        f"партий {games}, пропущено (не 3x3) {stats['skipped']}, некорректных {stats['invalid']}, "
+        f"{games * 60 / elapsed:.0f} партий/мин",
+        file=file,
+    )
+    results = stats["results"]
+    print(
+        f"исходы: X {results[record.X_WINS]}  O {results[record.O_WINS]}  ничьих {results[record.DRAW]}  "
+        f"не доиграно {results[record.ONGOING]}",
+        file=file,
+    )
+    for name, counts in zip("XO", stats["sides"]):
+        moves = sum(counts) or 1
+        shares = "  ".join(f"{tag} {count / moves:6.1%}" for tag, count in zip(TAGS, counts))
+        print(f"{name}: ходов {sum(counts):>10d}  {shares}", file=file)
+    print(f"партий без грубых ошибок: {stats['clean'] / (games or 1):.1%}", file=file, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Разбор партий из архива: оценка каждого хода")
+    parser.add_argument("archive", help="архив партий (см. record.py)")
+    parser.add_argument("--engine", choices=ENGINES, default="solver", help="чем оценивать позиции")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk", type=int, default=50000, help="партий на одно задание")
+    parser.add_argument("--csv", help="записать статистику по номеру хода в CSV (- для stdout)")
+    args = parser.parse_args(argv)
+
+    with record.GameArchive(args.archive) as archive:
+        count = len(archive)
+    tasks = [(start, min(start + args.chunk, count)) for start in range(0, count, args.chunk)]
+
+    total = empty_stats()
+    started = time.perf_counter()
+    with ProcessPoolExecutor(args.workers) as pool:
+        futures = [pool.submit(analyze_range, args.archive, start, stop, args.engine) for start, stop in tasks]
+        for future in as_completed(futures):
+            merge(total, future.result())
+    elapsed = time.perf_counter() - started
+
+    log = sys.stdout
+    if args.csv:
+        out = sys.stdout if args.csv == "-" else open(args.csv, "w", newline="")
+        writer = csv.writer(out)
+        writer.writerow(["ply", "player", *TAGS])
+        for ply, counts in enumerate(total["plies"]):
+            writer.writerow([ply + 1, "XO"[ply & 1], *counts])
+        if out is sys.stdout:
+            log = sys.stderr
+        else:
+            out.close()
+    report(total, elapsed, log)
+
+
+if __name__ == "__main__":
+    main()
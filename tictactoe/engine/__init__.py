@@ -0,0 +1,3 @@
+from .rules import CELLS, FULL, O, SIZE, X, Board, Geometry, canonical, canonical_transform, geometry
+
+__all__ = ["CELLS", "FULL", "O", "SIZE", "X", "Board", "Geometry", "canonical", "canonical_transform", "geometry"]
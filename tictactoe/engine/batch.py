@@ -0,0 +1,74 @@
+from functools import lru_cache
+
+import numpy as np
+
+from .rules import X, O, geometry
+
+EMPTY = 0
+X_STONE = 1
+O_STONE = 2
+
+ONGOING = 0
+X_WINS = 1
+O_WINS = 2
+DRAW = 3
+
+OUTCOMES = {X: X_WINS, O: O_WINS}
+
+
+@lru_cache(maxsize=None)
+def line_indices(size=3, k=None):
+    geo = geometry(size, k)
+    lines = [[cell for cell in range(geo.cells) if line >> cell & 1] for line in geo.lines]
+    return np.array(lines, dtype=np.intp).reshape(len(lines), geo.k)
+
+
+def board_size(boards):
+    size = int(round(boards.shape[1] ** 0.5))
+    if size * size != boards.shape[1]:
+        raise ValueError(f"Число клеток {boards.shape[1]} не является квадратом")
+    return size
+
+
+def to_array(boards):
+    boards = list(boards)
+    if not boards:
+        return np.zeros((0, 9), np.int8)
+    cells = boards[0].cells
+    array = np.zeros((len(boards), cells), np.int8)
+    for row, board in enumerate(boards):
+        for cell in range(cells):
+            if board.x >> cell & 1:
+                array[row, cell] = X_STONE
+            elif board.o >> cell & 1:
+                array[row, cell] = O_STONE
+    return array
+
+
+# То же, что Board.winner()/is_full(): сначала проверяются линии X, потом O, потом заполненность
+def outcome(board):
+    winner = board.winner()
+    if winner is not None:
+        return OUTCOMES[winner]
+    return DRAW if board.is_full() else ONGOING
+
+
+# boards: (M, N*N) int8, 0 - пусто, 1 - X, 2 - O.
+# Возвращает исходы (M,) и маску допустимых ходов (M, N*N): пустые клетки незаконченных партий.
+def evaluate(boards, k=None, chunk=1 << 16):
+    boards = np.asarray(boards, dtype=np.int8)
+    lines = line_indices(board_size(boards), k)
+
+    outcomes = np.empty(len(boards), np.uint8)
+    for start in range(0, len(boards), chunk):
+        part = boards[start:start + chunk]
+        stones = part[:, lines]
+        x_wins = (stones == X_STONE).all(axis=2).any(axis=1)
+        o_wins = (stones == O_STONE).all(axis=2).any(axis=1)
+        full = (part != EMPTY).all(axis=1)
+        outcomes[start:start + chunk] = np.where(
+            x_wins, X_WINS, np.where(o_wins, O_WINS, np.where(full, DRAW, ONGOING))
+        )
+
+    legal = (boards == EMPTY) & (outcomes == ONGOING)[:, None]
+    return outcomes, legal
@@ -0,0 +1,112 @@
+import os
+import sys
+
+from .rules import CELLS, FULL, INVERSE, SIZE, Board, canonical_transform
+
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+# Результат для стороны, которая ходит
+WIN = 1
+DRAW = 2
+LOSS = 3
+
+NO_MOVE = 0x0F
+MISSING = 0
+
+# Номер позиции в троичной записи: клетка i даёт 3**i для X и 2 * 3**i для O
+TERNARY = tuple(sum(3 ** cell for cell in range(CELLS) if mask >> cell & 1) for mask in range(FULL + 1))
+TABLE_SIZE = 3 ** CELLS
+
+_table = None
+
+
+def supports(board):
+    return board.size == SIZE and board.k == SIZE
+
+
+def position_index(x, o):
+    return TERNARY[x] + 2 * TERNARY[o]
+
+
+def _outcome(score):
+    if score > 0:
+        return WIN
+    if score < 0:
+        return LOSS
+    return DRAW
+
+
+def build():
+    from .solver import Solver
+
+    solver = Solver()
+    table = bytearray(TABLE_SIZE)
+    stack = [Board()]
+    seen = set()
+    while stack:
+        board = stack.pop()
+        key, _ = canonical_transform(board.x, board.o)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        canon = Board(key >> CELLS, key & FULL)
+        move, score = solver.solve(canon)
+        table[position_index(canon.x, canon.o)] = (_outcome(score) << 4) | (NO_MOVE if move is None else move)
+
+        if not canon.is_over():
+            stack.extend(canon.play(cell) for cell in canon.moves())
+    return bytes(table), len(seen)
+
+
+def save(path=BOOK_PATH):
+    table, positions = build()
+    with open(path, "wb") as f:
+        f.write(table)
+    return positions
+
+
+def load(path=BOOK_PATH):
+    global _table
+    if _table is None:
+        try:
+            with open(path, "rb") as f:
+                table = f.read()
+        except OSError:
+            table = None
+        if table is None or len(table) != TABLE_SIZE:
+            table, _ = build()
+        _table = table
+    return _table
+
+
+# Возвращает (ход, результат) или (None, результат) для законченной партии
+def lookup(board):
+    if not supports(board):
+        raise ValueError(f"Книга есть только для доски {SIZE}x{SIZE}")
+    table = _table if _table is not None else load()
+    key, t = canonical_transform(board.x, board.o)
+    entry = table[position_index(key >> CELLS, key & FULL)]
+    if entry == MISSING:
+        raise KeyError(f"Позиции нет в книге: {board!r}")
+    move = entry & 0x0F
+    outcome = entry >> 4
+    if move == NO_MOVE:
+        return None, outcome
+    return INVERSE[t][move], outcome
+
+
+def best_move(board):
+    return lookup(board)[0]
+
+
+# Книга знает только исход: 1 - выигрыш, 0 - ничья, -1 - проигрыш для того, кто ходит
+def move_values(board):
+    signs = {WIN: 1, DRAW: 0, LOSS: -1}
+    return {move: -signs[lookup(board.play(move))[1]] for move in board.moves()}
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else BOOK_PATH
+    positions = save(path)
+    print(f"Записано позиций: {positions} -> {path}")
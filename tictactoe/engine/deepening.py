@@ -0,0 +1,222 @@
+import random
+import time
+
+from .. import metrics
+from .evaluation import exact, horizon_values
+from .mcts import candidate_moves
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+KILLERS = 2
+# Таблица позиций живёт между ходами, пока не разрастётся
+MAX_ENTRIES = 1 << 20
+# Время проверяется раз в CHECK_EVERY узлов
+CHECK_EVERY = 16
+
+
+class _Timeout(Exception):
+    pass
+
+
+# Поиск на 1, 2, 3... полуходов, пока не кончится время на ход; возвращается лучший ход последней
+# законченной итерации. Порядок ходов: ход из таблицы (главный вариант прошлой итерации), ходы-убийцы
+# на этой глубине, затем по истории отсечений. После хода видны depth, elapsed, nodes, score и pv.
+# cache - каталог общего для всех процессов кэша оценок на диске (evalcache.py), None - только в памяти.
+class DeepeningPlayer:
+    def __init__(self, budget=0.5, max_depth=None, patterns=True, seed=None, cache=None):
+        self.budget = budget
+        self.max_depth = max_depth
+        self.patterns = patterns
+        self.cache = cache
+        self.disk = None
+        self.random = random.Random(seed)
+        self.table = {}
+        self.history = {}
+        self.killers = []
+        self.geometry = None
+        self.evaluator = None
+        self.deadline = None
+        self.cancel = None
+        self.depth = 0
+        self.elapsed = 0.0
+        self.nodes = 0
+        self.score = None
+        self.pv = []
+
+    def reset(self):
+        self.table.clear()
+        self.history.clear()
+
+    def choose_move(self, board, cancel=None, budget=None):
+        if board.is_over():
+            raise ValueError("Партия уже закончена")
+        start = time.perf_counter()
+        self._prepare(board)
+        self.cancel = cancel
+        self.nodes = 0
+
+        moves = candidate_moves(board)
+        self.random.shuffle(moves)
+        limit = board.cells - board.occupied.bit_count()
+        if self.max_depth is not None:
+            limit = min(limit, self.max_depth)
+        best_move, best_score, completed = moves[0], None, 0
+        # Первая итерация доводится до конца при любом бюджете, чтобы было что вернуть
+        self.deadline = None
+        for depth in range(1, limit + 1):
+            try:
+                values = self._root(board, moves, depth)
+            except _Timeout:
+                break
+            # Ходы следующей итерации - по оценкам этой, лучший первым
+            moves.sort(key=values.__getitem__, reverse=True)
+            best_move, best_score, completed = moves[0], values[moves[0]], depth
+            allowed = self.budget if budget is None else budget
+            self.deadline = start + allowed
+            # Найденный выигрыш или проигрыш глубже не изменится; следующая итерация в разы дольше этой,
+            # и если прошло больше половины времени, она всё равно не успеет закончиться
+            if abs(best_score) >= 1 or self._expired() or time.perf_counter() - start > allowed / 2:
+                break
+
+        self.depth = completed
+        self.score = best_score
+        self.elapsed = time.perf_counter() - start
+        self.pv = self._pv(board, best_move)
+        if metrics.enabled:
+            metrics.observe("deepening.depth", completed)
+            metrics.observe("deepening.search_us", self.elapsed * 1e6)
+            metrics.observe("deepening.nodes", self.nodes)
+        return best_move
+
+    def _prepare(self, board):
+        if board.geometry is not self.geometry or len(self.table) > MAX_ENTRIES:
+            self.reset()
+            self.geometry = board.geometry
+            self.evaluator = None
+            if self.patterns and not exact(board):
+                from . import patterns
+
+                self.evaluator = patterns.load(board.size, board.k)
+            if self.cache is not None:
+                from . import evalcache
+
+                tag = self.evaluator.fingerprint() if self.evaluator is not None else 0
+                self.disk = evalcache.load(board.size, board.k, tag, self.cache)
+        # Старая история отсечений весит вдвое меньше новой
+        for move in self.history:
+            self.history[move] //= 2
+        self.killers = [[] for _ in range(board.cells + 1)]
+
+    def _expired(self):
+        if self.cancel is not None and self.cancel.is_set():
+            return True
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    # Оценки всех ходов корня; у ходов хуже лучшего - только верхняя граница, для порядка этого хватает
+    def _root(self, board, moves, depth):
+        if depth <= 1 and self.evaluator is not None:
+            return horizon_values(board, self.evaluator)
+        values = {}
+        bound = board.cells + 1
+        alpha = -bound
+        for move in moves:
+            child = board.play(move)
+            if child.winner() is not None:
+                score = bound - child.occupied.bit_count()
+            elif depth <= 1 or child.is_full():
+                score = 0
+            else:
+                score = -self._search(child, depth - 1, -bound, -alpha, 1)
+            values[move] = score
+            alpha = max(alpha, score)
+        return values
+
+    def _search(self, board, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY == 0 and self._expired():
+            raise _Timeout
+
+        hint = None
+        entry = self.table.get(board.zobrist)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(board.zobrist)
+            if entry is not None:
+                self.table[board.zobrist] = entry
+        if entry is not None:
+            entry_depth, value, flag, hint = entry
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return value
+                if flag == LOWER and value >= beta:
+                    return value
+                if flag == UPPER and value <= alpha:
+                    return value
+        if depth <= 1 and self.evaluator is not None:
+            values = horizon_values(board, self.evaluator)
+            best_move = max(values, key=values.__getitem__)
+            self._store(board.zobrist, 1, values[best_move], EXACT, best_move)
+            return values[best_move]
+
+        original_alpha = alpha
+        best, best_move = -board.cells - 1, None
+        bound = board.cells + 1
+        for move in self._ordered(board, hint, ply):
+            child = board.play(move)
+            if child.winner() is not None:
+                score = bound - child.occupied.bit_count()
+            elif depth <= 1 or child.is_full():
+                score = 0
+            else:
+                score = -self._search(child, depth - 1, -beta, -alpha, ply + 1)
+            if score > best:
+                best, best_move = score, move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self._cutoff(move, depth, ply)
+                        break
+
+        if best <= original_alpha:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self._store(board.zobrist, depth, best, flag, best_move)
+        return best
+
+    def _store(self, key, depth, score, flag, move):
+        self.table[key] = (depth, score, flag, move)
+        if self.disk is not None:
+            self.disk.put(key, depth, score, flag, move)
+
+    def _ordered(self, board, hint, ply):
+        history = self.history
+        moves = sorted(candidate_moves(board), key=lambda move: history.get(move, 0), reverse=True)
+        first = [move for move in self.killers[ply] if move != hint and board.is_empty(move)]
+        if hint is not None:
+            first.insert(0, hint)
+        if first:
+            moves = first + [move for move in moves if move not in first]
+        return moves
+
+    def _cutoff(self, move, depth, ply):
+        self.history[move] = self.history.get(move, 0) + depth * depth
+        killers = self.killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[KILLERS:]
+
+    # Главный вариант - лучшие ходы из таблицы, начиная с выбранного
+    def _pv(self, board, move):
+        line = []
+        seen = set()
+        while move is not None and board.zobrist not in seen and not board.is_over():
+            seen.add(board.zobrist)
+            line.append(move)
+            board = board.play(move)
+            entry = self.table.get(board.zobrist)
+            move = entry[3] if entry is not None else None
+        return line
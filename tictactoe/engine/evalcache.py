@@ -0,0 +1,181 @@
+import mmap
+import os
+import struct
+
+from .. import metrics
+
+CACHE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MAGIC = b"XOEC\x01"
+# Размер доски, число в ряд, отпечаток весов оценки, число корзин, номер запуска
+HEADER = struct.Struct(">5sBBIIH")
+DATA_OFFSET = 64
+
+# Запись - два 64-битных слова: данные и данные XOR ключ (Зобрист позиции). Запись, которую другой процесс
+# переписал наполовину, не пройдёт проверку и будет промахом, поэтому ни чтению, ни записи блокировки не нужны
+SLOT = struct.Struct("<QQ")
+BUCKET = 4
+BUCKET_WORDS = struct.Struct(f"<{2 * BUCKET}Q")
+DEFAULT_SLOTS = 1 << 20
+
+# Данные: оценка (float32) | ход << 32 | флаг << 48 | глубина << 50 | сеанс << 58
+SCORE = struct.Struct("<f")
+BITS = struct.Struct("<I")
+SESSIONS = 64
+
+_caches = {}
+
+
+def path_for(size, k, directory=CACHE_DIR):
+    return os.path.join(directory, f"evalcache{size}x{size}k{k}.bin")
+
+
+def _read_header(path):
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+    except OSError:
+        return None
+    if len(header) < HEADER.size:
+        return ()
+    return HEADER.unpack(header)[:5]
+
+
+# Файл собирается рядом и подменяется целиком, чтобы другой процесс не открыл его наполовину записанным;
+# replace=False - только если файла ещё нет (его мог успеть создать соседний процесс)
+def _create(path, size, k, tag, buckets, replace):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(HEADER.pack(MAGIC, size, k, tag, buckets, 0))
+        f.truncate(DATA_OFFSET + buckets * BUCKET * SLOT.size)
+    try:
+        if replace:
+            os.replace(temporary, path)
+        else:
+            os.link(temporary, path)
+    except FileExistsError:
+        pass
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+# Таблица с открытой адресацией фиксированного размера: ключ попадает в корзину из BUCKET записей.
+# Вытесняется сначала пустая запись, затем запись прошлого сеанса, затем самая мелкая по глубине.
+class EvalCache:
+    def __init__(self, path, size, k, tag=0, slots=DEFAULT_SLOTS):
+        buckets = max(slots // BUCKET, 1)
+        expected = (MAGIC, size, k, tag, buckets)
+        header = _read_header(path)
+        if header is None:
+            _create(path, size, k, tag, buckets, replace=False)
+            header = _read_header(path)
+        # Другие веса оценки или другой размер - старые оценки не годятся
+        if header != expected:
+            _create(path, size, k, tag, buckets, replace=True)
+
+        self.path = path
+        self.buckets = buckets
+        self.file = open(path, "r+b")
+        self.data = mmap.mmap(self.file.fileno(), 0)
+        # Сеанс - весь запуск (см. start_run), а не открытие файла: записи соседних процессов того же
+        # запуска свежие, и более мелкие оценки их не вытесняют
+        self.session = HEADER.unpack_from(self.data)[5] % SESSIONS
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def close(self):
+        self.data.flush()
+        self.data.close()
+        self.file.close()
+
+    def _offset(self, key):
+        return DATA_OFFSET + key % self.buckets * BUCKET * SLOT.size
+
+    # (глубина, оценка, флаг, ход) или None
+    def get(self, key):
+        words = BUCKET_WORDS.unpack_from(self.data, self._offset(key))
+        for i in range(0, 2 * BUCKET, 2):
+            check, data = words[i], words[i + 1]
+            if data and check ^ data == key:
+                self.hits += 1
+                if metrics.enabled:
+                    metrics.count("evalcache.hit")
+                score = SCORE.unpack(BITS.pack(data & 0xFFFFFFFF))[0]
+                return data >> 50 & 0xFF, score, data >> 48 & 3, data >> 32 & 0xFFFF
+        self.misses += 1
+        if metrics.enabled:
+            metrics.count("evalcache.miss")
+        return None
+
+    def put(self, key, depth, score, flag, move):
+        offset = self._offset(key)
+        words = BUCKET_WORDS.unpack_from(self.data, offset)
+        victim, victim_rank = 0, None
+        for slot in range(BUCKET):
+            check, data = words[2 * slot], words[2 * slot + 1]
+            if data and check ^ data == key:
+                # Более глубокую оценку этого сеанса не затираем
+                if data >> 58 == self.session and data >> 50 & 0xFF > depth:
+                    return
+                victim = slot
+                break
+            rank = (data >> 58 == self.session, data >> 50 & 0xFF) if data else (False, -1)
+            if victim_rank is None or rank < victim_rank:
+                victim, victim_rank = slot, rank
+        data = (
+            BITS.unpack(SCORE.pack(score))[0]
+            | move << 32
+            | flag << 48
+            | min(depth, 0xFF) << 50
+            | self.session << 58
+        )
+        SLOT.pack_into(self.data, offset + victim * SLOT.size, key ^ data, data)
+        self.writes += 1
+
+    def used(self):
+        return sum(1 for _, data in SLOT.iter_unpack(self.data[DATA_OFFSET:]) if data)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "writes": self.writes,
+            "slots": self.buckets * BUCKET,
+        }
+
+
+# Новый запуск: записи прошлых запусков становятся первыми на вытеснение. Вызывается один раз в родительском
+# процессе до запуска рабочих, поэтому заголовок меняет только он. Файла ещё нет - сеанс будет нулевым
+def start_run(size, k, directory=CACHE_DIR):
+    path = path_for(size, k, directory)
+    try:
+        with open(path, "r+b") as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            magic, file_size, file_k, tag, buckets, generation = HEADER.unpack(header)
+            if (magic, file_size, file_k) != (MAGIC, size, k):
+                return
+            f.seek(0)
+            f.write(HEADER.pack(magic, file_size, file_k, tag, buckets, (generation + 1) & 0xFFFF))
+    except FileNotFoundError:
+        pass
+
+
+# Один открытый кэш на (размер, число в ряд, отпечаток оценки, каталог) в процессе
+def load(size, k, tag=0, directory=CACHE_DIR, slots=DEFAULT_SLOTS):
+    key = (size, k, tag, directory)
+    cache = _caches.get(key)
+    if cache is None:
+        cache = _caches[key] = EvalCache(path_for(size, k, directory), size, k, tag, slots)
+    return cache
+
+
+def unload():
+    for cache in _caches.values():
+        cache.close()
+    _caches.clear()
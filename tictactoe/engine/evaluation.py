@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .. import metrics
+from .mcts import candidate_moves
+from .rules import SIZE
+
+MAX_ENTRIES = 1 << 14
+
+
+class EvaluationCache:
+    def __init__(self, maxsize=MAX_ENTRIES):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    # Самая давно не использованная запись вытесняется, когда кэш полон
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+            }
+
+
+# Один кэш на процесс: его делят все уровни сложности и все партии
+shared = EvaluationCache()
+
+
+def stats():
+    return shared.stats()
+
+
+def exact(board):
+    return board.size == SIZE and board.k == SIZE
+
+
+# Точные оценки есть для 3x3 (решатель) и для досок с собранной таблицей эндшпиля
+def has_exact(board):
+    from . import tablebase
+
+    return exact(board) or tablebase.load(board.size, board.k) is not None
+
+
+def _exact_values(board):
+    if exact(board):
+        from .solver import move_values
+
+        return move_values(board)
+    from . import tablebase
+
+    table = tablebase.load(board.size, board.k)
+    if table is None:
+        raise ValueError(f"Точной оценки для доски {board.size}x{board.size}, {board.k} в ряд нет")
+    return table.move_values(board)
+
+
+# Оценки всех ходов на горизонте одним вызовом evaluator (см. patterns.py): выигрыш точный, остальное в (-1, 1)
+def horizon_values(board, evaluator):
+    moves = candidate_moves(board)
+    values, wins = evaluator.score_children(board, moves)
+    win = board.cells - board.occupied.bit_count()
+    if win == 1:
+        return {move: win if won else 0 for move, won in zip(moves, wins.tolist())}
+    return {move: win if won else -value for move, value, won in zip(moves, values.tolist(), wins.tolist())}
+
+
+# Оценка для того, кто ходит: выигрыш - тем больше, чем он ближе, на горизонте - 0 или оценка evaluator
+def _negamax(board, depth, alpha, beta, evaluator=None):
+    if depth <= 1 and evaluator is not None:
+        return max(horizon_values(board, evaluator).values())
+    best = -board.cells - 1
+    for move in candidate_moves(board):
+        child = board.play(move)
+        if child.winner() is not None:
+            score = board.cells + 1 - child.occupied.bit_count()
+        elif depth <= 1 or child.is_full():
+            score = 0
+        else:
+            score = -_negamax(child, depth - 1, -beta, -alpha, evaluator)
+        if score > best:
+            best = score
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+    return best
+
+
+def _shallow_values(board, depth, evaluator=None):
+    if depth <= 1 and evaluator is not None:
+        return horizon_values(board, evaluator)
+    values = {}
+    bound = board.cells + 1
+    for move in candidate_moves(board):
+        child = board.play(move)
+        if child.winner() is not None:
+            values[move] = bound - child.occupied.bit_count()
+        elif depth <= 1 or child.is_full():
+            values[move] = 0
+        else:
+            values[move] = -_negamax(child, depth - 1, -bound, bound, evaluator)
+    return values
+
+
+# Оценки ходов {ход: оценка}: depth=None - точные (см. has_exact), иначе поиск на depth полуходов;
+# evaluator оценивает позиции на горизонте вместо нуля
+def move_values(board, depth=None, evaluator=None):
+    key = (board.size, board.k, board.x, board.o, depth, evaluator.fingerprint() if evaluator is not None else None)
+    values = shared.get(key)
+    if values is None:
+        started = metrics.enabled and time.perf_counter()
+        values = _exact_values(board) if depth is None else _shallow_values(board, depth, evaluator)
+        shared.put(key, values)
+        if started:
+            metrics.elapsed("eval.compute_us", started)
+            metrics.count("eval.miss")
+    elif metrics.enabled:
+        metrics.count("eval.hit")
+    return values
@@ -0,0 +1,187 @@
+import math
+import random
+import time
+
+from .. import metrics
+from .rules import O, X
+
+_neighbourhoods = {}
+
+
+def neighbourhoods(geometry, radius=1):
+    key = (geometry, radius)
+    masks = _neighbourhoods.get(key)
+    if masks is None:
+        size = geometry.size
+        masks = []
+        for cell in range(geometry.cells):
+            row, col = divmod(cell, size)
+            mask = 0
+            for r in range(max(0, row - radius), min(size, row + radius + 1)):
+                for c in range(max(0, col - radius), min(size, col + radius + 1)):
+                    mask |= 1 << (r * size + c)
+            masks.append(mask)
+        masks = _neighbourhoods[key] = tuple(masks)
+    return masks
+
+
+# На большой доске имеет смысл ходить только рядом с уже стоящими камнями
+def candidate_moves(board):
+    geometry = board.geometry
+    occupied = board.occupied
+    if not occupied:
+        return [geometry.cells // 2]
+    if geometry.size <= 4:
+        return board.moves()
+
+    masks = neighbourhoods(geometry)
+    near = 0
+    stones = occupied
+    while stones:
+        low = stones & -stones
+        near |= masks[low.bit_length() - 1]
+        stones ^= low
+    near &= ~occupied
+
+    moves = []
+    while near:
+        low = near & -near
+        moves.append(low.bit_length() - 1)
+        near ^= low
+    return moves
+
+
+class Node:
+    __slots__ = ("move", "parent", "player", "children", "untried", "visits", "wins")
+
+    def __init__(self, move, parent, player, untried):
+        self.move = move
+        self.parent = parent
+        self.player = player
+        self.children = []
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0.0
+
+
+class MctsPlayer:
+    def __init__(self, budget=0.5, exploration=1.4, seed=None):
+        self.budget = budget
+        self.exploration = exploration
+        self.random = random.Random(seed)
+        self.root = None
+        self.root_board = None
+        self.playouts = 0
+        self.elapsed = 0.0
+
+    @property
+    def playouts_per_second(self):
+        return self.playouts / self.elapsed if self.elapsed else 0.0
+
+    def reset(self):
+        self.root = None
+        self.root_board = None
+
+    # cancel - threading.Event: если он выставлен, поиск заканчивается досрочно
+    def choose_move(self, board, cancel=None, budget=None):
+        if board.is_over():
+            raise ValueError("Партия уже закончена")
+        deadline = time.perf_counter() + (self.budget if budget is None else budget)
+        start = time.perf_counter()
+        root = self._advance(board)
+        playouts = 0
+        while True:
+            self._iterate(root, board)
+            playouts += 1
+            if playouts & 15 == 0 and (time.perf_counter() >= deadline or cancel is not None and cancel.is_set()):
+                break
+        self.playouts = playouts
+        self.elapsed = time.perf_counter() - start
+        if metrics.enabled:
+            metrics.observe("mcts.search_us", self.elapsed * 1e6)
+            metrics.observe("mcts.playouts", playouts)
+        return max(root.children, key=lambda child: child.visits).move
+
+    # Переиспользуем поддерево от прошлого хода, если партия продолжилась из него
+    def _advance(self, board):
+        node, node_board = self.root, self.root_board
+        while node is not None and node_board != board:
+            if node_board.geometry is not board.geometry or node_board.occupied & ~board.occupied:
+                node = None
+                break
+            for child in node.children:
+                child_board = node_board.play(child.move)
+                if child_board.x & ~board.x == 0 and child_board.o & ~board.o == 0:
+                    node, node_board = child, child_board
+                    break
+            else:
+                node = None
+
+        if node is None:
+            node = Node(None, None, None, candidate_moves(board))
+            self.random.shuffle(node.untried)
+        node.parent = None
+        self.root, self.root_board = node, board
+        return node
+
+    def _iterate(self, root, board):
+        node = root
+        exploration = self.exploration
+
+        # Выбор
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            best, best_value = None, -1.0
+            for child in node.children:
+                value = child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits)
+                if value > best_value:
+                    best, best_value = child, value
+            node = best
+            board = board.play(node.move)
+
+        # Расширение
+        if node.untried and board.winner() is None:
+            move = node.untried.pop()
+            player = board.turn
+            board = board.play(move)
+            untried = [] if board.is_over() else candidate_moves(board)
+            self.random.shuffle(untried)
+            child = Node(move, node, player, untried)
+            node.children.append(child)
+            node = child
+
+        winner = self._rollout(board)
+
+        # Обратное распространение
+        while node is not None:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == node.player:
+                node.wins += 1.0
+            node = node.parent
+
+    def _rollout(self, board):
+        winner = board.winner()
+        if winner is not None or board.is_full():
+            return winner
+
+        geometry = board.geometry
+        cell_lines = geometry.cell_lines
+        x, o = board.x, board.o
+        free = board.moves()
+        self.random.shuffle(free)
+        x_turn = board.turn == X
+        for cell in free:
+            if x_turn:
+                x |= 1 << cell
+                for line in cell_lines[cell]:
+                    if x & line == line:
+                        return X
+            else:
+                o |= 1 << cell
+                for line in cell_lines[cell]:
+                    if o & line == line:
+                        return O
+            x_turn = not x_turn
+        return None
@@ -0,0 +1,106 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+
+from .. import metrics
+from .mcts import MctsPlayer
+from .rules import Board
+
+CANCEL_POLL = 0.01
+
+_executors = {}
+
+
+def executor(workers=None):
+    workers = workers or os.cpu_count() or 1
+    pool = _executors.get(workers)
+    if pool is None:
+        # spawn: рабочие процессы не должны наследовать состояние Qt из GUI
+        pool = _executors[workers] = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    return pool
+
+
+def shutdown():
+    for pool in _executors.values():
+        pool.shutdown(cancel_futures=True)
+    _executors.clear()
+
+
+# Выполняется в рабочем процессе: независимое дерево от той же позиции
+def _search(position, budget, seed):
+    x, o, size, k = position
+    player = MctsPlayer(budget, seed=seed)
+    player.choose_move(Board(x, o, size, k))
+    stats = {child.move: (child.visits, child.wins) for child in player.root.children}
+    return stats, player.playouts
+
+
+class ParallelMctsPlayer:
+    def __init__(self, budget=0.5, workers=None, seed=0):
+        self.budget = budget
+        self.workers = workers or os.cpu_count() or 1
+        self.seed = seed
+        self.playouts = 0
+        self.elapsed = 0.0
+
+    @property
+    def playouts_per_second(self):
+        return self.playouts / self.elapsed if self.elapsed else 0.0
+
+    def reset(self):
+        pass
+
+    # Рабочие процессы доигрывают свой бюджет, но ждать их после отмены незачем
+    def choose_move(self, board, cancel=None):
+        future = self.submit(board)
+        if cancel is None:
+            return future.result()
+        while True:
+            try:
+                return future.result(CANCEL_POLL)
+            except TimeoutError:
+                if cancel.is_set():
+                    return None
+
+    # Возвращает Future с ходом; деревья рабочих процессов объединяются по числу посещений
+    def submit(self, board):
+        if board.is_over():
+            raise ValueError("Партия уже закончена")
+
+        result = Future()
+        position = (board.x, board.o, board.size, board.k)
+        pool = executor(self.workers)
+        start = time.perf_counter()
+        self.seed += 1
+        parts = [pool.submit(_search, position, self.budget, self.seed * self.workers + i) for i in range(self.workers)]
+        pending = [len(parts)]
+        lock = threading.Lock()
+
+        def merge(_):
+            with lock:
+                pending[0] -= 1
+                if pending[0]:
+                    return
+            try:
+                visits = {}
+                playouts = 0
+                for part in parts:
+                    stats, part_playouts = part.result()
+                    playouts += part_playouts
+                    for move, (move_visits, _) in stats.items():
+                        visits[move] = visits.get(move, 0) + move_visits
+            except Exception as error:
+                result.set_exception(error)
+                return
+            self.playouts = playouts
+            self.elapsed = time.perf_counter() - start
+            if metrics.enabled:
+                metrics.observe("parallel.search_us", self.elapsed * 1e6)
+                metrics.observe("parallel.playouts", playouts)
+            result.set_result(max(visits, key=visits.get))
+
+        for part in parts:
+            part.add_done_callback(merge)
+        return result
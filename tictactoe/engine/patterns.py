@@ -0,0 +1,331 @@
+import argparse
+import os
+import time
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from .batch import EMPTY, O_STONE, X_STONE, line_indices
+from .rules import X, geometry
+
+WEIGHTS_DIR = os.path.dirname(os.path.abspath(__file__))
+CHUNK = 1 << 13
+# tanh во float32 округляется до ±1 уже при |x| > 9, а 1 в поиске - это выигрыш; граница представима во float32
+LIMIT = 1 - 1e-6
+
+_evaluators = {}
+
+
+def weights_path(size, k, directory=WEIGHTS_DIR):
+    return os.path.join(directory, f"patterns{size}x{size}k{k}.npz")
+
+
+# Для каждой клетки - номера линий через неё; недостающие места заняты фиктивной линией с номером L
+@lru_cache(maxsize=None)
+def cell_lines(size, k=None):
+    geo = geometry(size, k)
+    through = [[] for _ in range(geo.cells)]
+    for number, line in enumerate(geo.lines):
+        for cell in range(geo.cells):
+            if line >> cell & 1:
+                through[cell].append(number)
+    width = max(len(lines) for lines in through)
+    table = np.full((geo.cells, width), len(geo.lines), np.intp)
+    for cell, lines in enumerate(through):
+        table[cell, :len(lines)] = lines
+    return table
+
+
+# Код линии: x + (k + 1) * o, где x и o - число камней в ней; фиктивная линия смешанная и ничего не даёт
+@lru_cache(maxsize=None)
+def _stone_codes(k):
+    return np.array([0, 1, k + 1], np.int16)
+
+
+def line_codes(boards, k, lines):
+    codes = _stone_codes(k)[boards][:, lines].sum(axis=2, dtype=np.int16)
+    return np.concatenate((codes, np.full((len(boards), 1), k + 2, np.int16)), axis=1)
+
+
+# PURE[code] - ячейка гистограммы цвет * (k + 1) + число камней для линии без камней соперника,
+# для смешанных и пустых линий - лишняя ячейка 2 * (k + 1)
+@lru_cache(maxsize=None)
+def _pure(k):
+    side = k + 1
+    pure = np.full(side * side + side + 1, 2 * side, np.int8)
+    for count in range(1, k + 1):
+        pure[count] = count
+        pure[count * side] = side + count
+    return pure
+
+
+# Мелкие массивы (дети одной позиции) быстрее считает bincount, большие пачки - сравнения по ячейкам
+def _bincount(cells, k):
+    if cells.size > 1 << 16:
+        hist = np.zeros((len(cells), 2, k + 1), np.int16)
+        for color in range(2):
+            for count in range(1, k + 1):
+                hist[:, color, count] = (cells == color * (k + 1) + count).sum(axis=1)
+        return hist
+    width = 2 * (k + 1) + 1
+    rows = np.arange(len(cells))[:, None] * width
+    counts = np.bincount((rows + cells).ravel(), minlength=len(cells) * width)
+    return counts.reshape(len(cells), width)[:, :-1].reshape(len(cells), 2, k + 1)
+
+
+# hist[m, цвет, c] - сколько линий с c камнями цвета (0 - X, 1 - O) и без камней соперника
+def histograms(codes, k):
+    return _bincount(_pure(k)[codes], k)
+
+
+def to_row(board):
+    width = (board.cells + 7) // 8
+    row = np.zeros(board.cells, np.int8)
+    x = np.unpackbits(np.frombuffer(board.x.to_bytes(width, "little"), np.uint8), bitorder="little")[:board.cells]
+    o = np.unpackbits(np.frombuffer(board.o.to_bytes(width, "little"), np.uint8), bitorder="little")[:board.cells]
+    row[x == 1] = X_STONE
+    row[o == 1] = O_STONE
+    return row
+
+
+# Начальные веса: свои незаблокированные линии ценятся выше чужих, каждый камень в линии - вчетверо
+def default_weights(k):
+    counts = np.arange(1, k, dtype=np.float32)
+    scale = 4.0 ** (counts - k + 1)
+    return np.stack((2 * scale, -scale)), 0.0
+
+
+# Оценка в (-1, 1) для стороны, которая ходит: линейная модель по числу открытых линий с 1..k-1 камнями.
+# В поиске выигрыш всегда больше 1, поэтому оценка его не перебивает.
+class Evaluator:
+    def __init__(self, size, k=None, weights=None, bias=None):
+        geo = geometry(size, k)
+        self.size = size
+        self.k = geo.k
+        self.cells = geo.cells
+        self.lines = line_indices(size, geo.k)
+        self.through = cell_lines(size, geo.k)
+        default, default_bias = default_weights(self.k)
+        self.weights = np.asarray(default if weights is None else weights, np.float32).reshape(2, self.k - 1)
+        self.bias = float(default_bias if bias is None else bias)
+
+    # Меняется вместе с весами: по нему сохранённые оценки (evalcache.py) отличают от оценок старых весов
+    def fingerprint(self):
+        return zlib.crc32(self.weights.tobytes() + np.float64(self.bias).tobytes())
+
+    def features(self, hist, side):
+        rows = np.arange(len(hist))
+        return np.concatenate((hist[rows, side, 1:self.k], hist[rows, 1 - side, 1:self.k]), axis=1).astype(np.float32)
+
+    # side - кто ходит (0 - X, 1 - O); собранная линия у того, кто только что ходил, - проигрыш
+    def values(self, hist, side):
+        rows = np.arange(len(hist))
+        values = np.clip(np.tanh(self.features(hist, side) @ self.weights.reshape(-1) + self.bias), -LIMIT, LIMIT)
+        values[hist[rows, 1 - side, self.k] > 0] = -1.0
+        values[hist[rows, side, self.k] > 0] = 1.0
+        return values
+
+    # boards: (M, N*N) int8 как в batch.py; кто ходит, определяется по числу камней
+    def score(self, boards):
+        boards = np.asarray(boards, np.int8)
+        values = np.empty(len(boards), np.float32)
+        for start in range(0, len(boards), CHUNK):
+            part = boards[start:start + CHUNK]
+            side = ((part == X_STONE).sum(axis=1) > (part == O_STONE).sum(axis=1)).astype(np.intp)
+            values[start:start + CHUNK] = self.values(histograms(line_codes(part, self.k, self.lines), self.k), side)
+        return values
+
+    # Гистограммы позиций после хода stone в клетку cells родителя parents: меняются только линии через клетку
+    def children(self, codes, hist, parents, cells, stone):
+        pure = _pure(self.k)
+        before = codes[parents[:, None], self.through[cells]]
+        after = before + _stone_codes(self.k)[stone]
+        return hist[parents] + _bincount(pure[after], self.k) - _bincount(pure[before], self.k)
+
+    # Оценки всех ходов moves одним вызовом: (оценки для соперника после хода, ход выигрывает)
+    def score_children(self, board, moves):
+        codes = line_codes(to_row(board)[None, :], self.k, self.lines)
+        hist = histograms(codes, self.k)
+        stone = X_STONE if board.turn == X else O_STONE
+        cells = np.asarray(moves, np.intp)
+        child = self.children(codes, hist, np.zeros(len(cells), np.intp), cells, stone)
+        mover = 0 if stone == X_STONE else 1
+        values = self.values(child, np.full(len(cells), 1 - mover, np.intp))
+        return values, child[:, mover, self.k] > 0
+
+    def save(self, path):
+        np.savez(path, weights=self.weights, bias=np.float32(self.bias), size=self.size, k=self.k)
+
+
+# Обученные веса рядом с модулем: свои для этой доски, иначе с доски TRAINED_SIZE с тем же k (признаки от размера
+# доски не зависят), иначе начальные. С пакетом идут веса для 15x15, 5 в ряд; обучение - вручную, запуском этого
+# модуля (python -m tictactoe.engine.patterns), сами агенты ничего не обучают.
+TRAINED_SIZE = 15
+
+
+def load(size, k=None, directory=WEIGHTS_DIR):
+    k = geometry(size, k).k
+    key = (size, k, directory)
+    evaluator = _evaluators.get(key)
+    if evaluator is None:
+        for path in (weights_path(size, k, directory), weights_path(TRAINED_SIZE, k, directory)):
+            if os.path.exists(path):
+                data = np.load(path)
+                evaluator = Evaluator(size, k, data["weights"], float(data["bias"]))
+                break
+        else:
+            evaluator = Evaluator(size, k)
+        _evaluators[key] = evaluator
+    return evaluator
+
+
+# Партии сразу на games досках: каждый ход - лучший по оценке (с вероятностью epsilon - случайный).
+# Возвращает позиции (P, N*N) и исход для стороны, которая в них ходит: 1, 0 или -1.
+def selfplay(evaluator, games, epsilon=0.1, rng=None):
+    rng = rng or np.random.default_rng()
+    k = evaluator.k
+    boards = np.zeros((games, evaluator.cells), np.int8)
+    winners = np.zeros(games, np.int8)
+    done = np.zeros(games, bool)
+    positions, owners, sides = [], [], []
+    for ply in range(evaluator.cells):
+        active = np.flatnonzero(~done)
+        if not active.size:
+            break
+        stone = X_STONE if ply % 2 == 0 else O_STONE
+        mover = ply % 2
+        part = boards[active]
+        positions.append(part.copy())
+        owners.append(active)
+        sides.append(np.full(len(active), stone, np.int8))
+
+        codes = line_codes(part, k, evaluator.lines)
+        hist = histograms(codes, k)
+        parents, cells = np.nonzero(part == EMPTY)
+        child = evaluator.children(codes, hist, parents, cells, stone)
+        # Ход выбирается так, чтобы оценка для соперника была минимальной
+        scores = evaluator.values(child, np.full(len(cells), 1 - mover, np.intp)) + rng.random(len(cells)) * 1e-3
+        explore = rng.random(len(active)) < epsilon
+        scores[explore[parents]] = rng.random(int(explore[parents].sum()))
+        order = np.lexsort((scores, parents))
+        first = np.flatnonzero(np.r_[True, parents[order][1:] != parents[order][:-1]])
+        chosen = order[first]
+
+        part[parents[chosen], cells[chosen]] = stone
+        boards[active] = part
+        won = child[chosen, mover, k] > 0
+        winners[active[won]] = stone
+        done[active[won]] = True
+        if ply == evaluator.cells - 1:
+            done[:] = True
+
+    positions = np.concatenate(positions)
+    results = winners[np.concatenate(owners)]
+    sides = np.concatenate(sides)
+    targets = np.where(results == 0, 0.0, np.where(results == sides, 1.0, -1.0)).astype(np.float32)
+    return positions, targets
+
+
+# Позиции из архива партий (см. record.py), например записанного selfplay --record
+def archive_positions(path, size, k):
+    from .. import record
+
+    k = geometry(size, k).k
+    positions, targets = [], []
+    for game in record.read_games(path):
+        if game.size != size or game.k != k or game.result == record.ONGOING:
+            continue
+        row = np.zeros(size * size, np.int8)
+        winner = {record.X_WINS: X_STONE, record.O_WINS: O_STONE}.get(game.result, 0)
+        for ply, move in enumerate(game.moves):
+            stone = X_STONE if ply % 2 == 0 else O_STONE
+            positions.append(row.copy())
+            targets.append(0.0 if not winner else 1.0 if winner == stone else -1.0)
+            row[move] = stone
+    return np.array(positions, np.int8).reshape(-1, size * size), np.array(targets, np.float32)
+
+
+# Градиентный спуск (Adam) по среднеквадратичной ошибке tanh(w·f + b) против исхода партии
+def fit(evaluator, positions, targets, epochs=300, rate=0.05):
+    features, side = [], []
+    for start in range(0, len(positions), CHUNK):
+        part = positions[start:start + CHUNK]
+        turn = ((part == X_STONE).sum(axis=1) > (part == O_STONE).sum(axis=1)).astype(np.intp)
+        hist = histograms(line_codes(part, evaluator.k, evaluator.lines), evaluator.k)
+        # Уже законченные позиции оценка знает точно, учить на них нечему
+        open_ = (hist[:, :, evaluator.k] == 0).all(axis=1)
+        features.append(evaluator.features(hist[open_], turn[open_]))
+        side.append(targets[start:start + CHUNK][open_])
+    features = np.concatenate(features)
+    targets = np.concatenate(side)
+
+    scale = features.std(axis=0) + 1e-6
+    x = features / scale
+    params = np.append(evaluator.weights.reshape(-1) * scale, evaluator.bias).astype(np.float64)
+    x = np.concatenate((x, np.ones((len(x), 1), np.float32)), axis=1)
+    first = np.zeros_like(params)
+    second = np.zeros_like(params)
+    for step in range(1, epochs + 1):
+        predicted = np.tanh(x @ params)
+        error = predicted - targets
+        gradient = x.T @ (error * (1 - predicted ** 2)) * (2 / len(x))
+        first = 0.9 * first + 0.1 * gradient
+        second = 0.999 * second + 0.001 * gradient ** 2
+        params -= rate * (first / (1 - 0.9 ** step)) / (np.sqrt(second / (1 - 0.999 ** step)) + 1e-8)
+    predicted = np.tanh(x @ params)
+    evaluator.weights = (params[:-1] / scale).astype(np.float32).reshape(2, evaluator.k - 1)
+    evaluator.bias = float(params[-1])
+    return float(((predicted - targets) ** 2).mean()), len(x)
+
+
+def accuracy(evaluator, positions, targets):
+    values = evaluator.score(positions)
+    decided = targets != 0
+    return float((np.sign(values[decided]) == targets[decided]).mean()) if decided.any() else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Обучение оценки позиции по линиям на партиях с самим собой")
+    parser.add_argument("--size", type=int, default=15)
+    parser.add_argument("--k", type=int, default=None)
+    parser.add_argument("--games", type=int, default=256, help="партий на поколение")
+    parser.add_argument("--generations", type=int, default=3)
+    parser.add_argument("--epsilon", type=float, default=0.1, help="доля случайных ходов")
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--archive", help="учиться на партиях из архива вместо игры с собой")
+    parser.add_argument("--out", help="куда записать веса (по умолчанию рядом с модулем)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    evaluator = Evaluator(args.size, args.k)
+    rng = np.random.default_rng(args.seed)
+    generations = 1 if args.archive else args.generations
+    for generation in range(generations):
+        started = time.perf_counter()
+        if args.archive:
+            positions, targets = archive_positions(args.archive, args.size, evaluator.k)
+        else:
+            positions, targets = selfplay(evaluator, args.games, args.epsilon, rng)
+        played = time.perf_counter() - started
+        if not len(positions):
+            print("Ошибка: нет партий для этой доски")
+            return
+        holdout = rng.random(len(positions)) < 0.1
+        started = time.perf_counter()
+        loss, used = fit(evaluator, positions[~holdout], targets[~holdout], args.epochs)
+        print(
+            f"поколение {generation}: позиций {len(positions)} ({played:.1f} с), обучение на {used} ({time.perf_counter() - started:.1f} с), "
+            f"ошибка {loss:.3f}, угадан победитель {accuracy(evaluator, positions[holdout], targets[holdout]):.1%}",
+            flush=True,
+        )
+    mine = " ".join(f"{weight:+.3f}" for weight in evaluator.weights[0])
+    theirs = " ".join(f"{weight:+.3f}" for weight in evaluator.weights[1])
+    print(f"веса по числу камней в линии 1..{evaluator.k - 1}: свои {mine}, чужие {theirs}, сдвиг {evaluator.bias:+.3f}")
+    path = args.out or weights_path(args.size, evaluator.k)
+    evaluator.save(path)
+    print(f"записано в {path}")
+
+
+if __name__ == "__main__":
+    main()
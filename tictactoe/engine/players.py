@@ -0,0 +1,146 @@
+import random
+
+from . import book, evaluation
+from .mcts import candidate_moves
+
+SHALLOW_DEPTH = 2
+BLUNDER_RATE = 0.2
+
+
+class RandomPlayer:
+    def __init__(self, seed=None):
+        self.random = random.Random(seed)
+
+    def choose_move(self, board, cancel=None):
+        return self.random.choice(board.moves())
+
+
+class BookPlayer:
+    def choose_move(self, board, cancel=None):
+        return book.best_move(board)
+
+
+class SolverPlayer:
+    def __init__(self):
+        from .solver import Solver
+
+        self.solver = Solver()
+
+    def choose_move(self, board, cancel=None):
+        return self.solver.solve(board)[0]
+
+
+# patterns=True - на горизонте оценка по линиям (patterns.py) вместо нуля
+class ShallowPlayer:
+    def __init__(self, depth=SHALLOW_DEPTH, seed=None, patterns=False):
+        self.depth = depth
+        self.random = random.Random(seed)
+        self.patterns = patterns
+
+    def choose_move(self, board, cancel=None):
+        evaluator = None
+        if self.patterns and not evaluation.exact(board):
+            from . import patterns
+
+            evaluator = patterns.load(board.size, board.k)
+        return _best(evaluation.move_values(board, self.depth, evaluator), self.random)
+
+
+# Точные оценки из общего кэша evaluation (3x3 или собранная таблица эндшпиля), иначе самый сильный поиск (MCTS).
+# Ход MCTS зависит от бюджета времени, поэтому в кэш не попадает
+class PerfectPlayer:
+    def __init__(self, budget=0.5, parallel=False, seed=None):
+        self.budget = budget
+        self.parallel = parallel
+        self.random = random.Random(seed)
+        self.seed = seed
+        self.search = None
+
+    def searcher(self):
+        if self.search is None:
+            if self.parallel:
+                from .parallel import ParallelMctsPlayer
+
+                self.search = ParallelMctsPlayer(self.budget, seed=self.seed or 0)
+            else:
+                from .mcts import MctsPlayer
+
+                self.search = MctsPlayer(self.budget, seed=self.seed)
+        return self.search
+
+    def choose_move(self, board, cancel=None):
+        if evaluation.has_exact(board):
+            return _best(evaluation.move_values(board), self.random)
+        return self.searcher().choose_move(board, cancel)
+
+    def reset(self):
+        if self.search is not None:
+            self.search.reset()
+
+
+# С вероятностью blunder_rate делает случайный ход, ухудшающий исход по точным оценкам (без них - любой),
+# иначе играет как PerfectPlayer
+class ImperfectPlayer(PerfectPlayer):
+    def __init__(self, blunder_rate=BLUNDER_RATE, budget=0.5, parallel=False, seed=None):
+        super().__init__(budget, parallel, seed)
+        self.blunder_rate = blunder_rate
+
+    def blunder(self, board):
+        if self.random.random() >= self.blunder_rate:
+            return None
+        if evaluation.has_exact(board):
+            # Более медленный выигрыш - не ошибка: сравниваются только исходы
+            outcomes = {move: (value > 0) - (value < 0) for move, value in evaluation.move_values(board).items()}
+            best = max(outcomes.values())
+            moves = [move for move, outcome in outcomes.items() if outcome < best]
+        else:
+            moves = candidate_moves(board)
+        return self.random.choice(moves) if moves else None
+
+    def choose_move(self, board, cancel=None):
+        move = self.blunder(board)
+        return super().choose_move(board, cancel) if move is None else move
+
+
+def _best(values, rng):
+    best = max(values.values())
+    return rng.choice([move for move, value in values.items() if value == best])
+
+
+AGENTS = ("random", "minimax", "mcts", "book", "patterns", "deepening", "shallow", "imperfect", "perfect")
+DIFFICULTIES = ("random", "shallow", "imperfect", "perfect")
+
+
+# cache и depth - только для deepening: каталог кэша оценок на диске и глубина вместо бюджета времени
+def create(name, budget=0.5, seed=None, cache=None, depth=None):
+    if name == "random":
+        return RandomPlayer(seed)
+    if name == "minimax":
+        return SolverPlayer()
+    if name == "book":
+        return BookPlayer()
+    if name == "patterns":
+        return ShallowPlayer(seed=seed, patterns=True)
+    if name == "deepening":
+        from .deepening import DeepeningPlayer
+
+        return DeepeningPlayer(budget if depth is None else float("inf"), depth, seed=seed, cache=cache)
+    if name == "mcts":
+        from .mcts import MctsPlayer
+
+        return MctsPlayer(budget, seed=seed)
+    if name in DIFFICULTIES:
+        return for_difficulty(name, budget, seed=seed)
+    raise ValueError(f"Неизвестный игрок: {name}")
+
+
+def for_difficulty(difficulty="perfect", budget=0.5, parallel=False, blunder_rate=BLUNDER_RATE, seed=None):
+    if difficulty == "random":
+        return RandomPlayer(seed)
+    if difficulty == "shallow":
+        return ShallowPlayer(seed=seed)
+    if difficulty == "imperfect":
+        return ImperfectPlayer(blunder_rate, budget, parallel, seed)
+    if difficulty == "perfect":
+        return PerfectPlayer(budget, parallel, seed)
+    raise ValueError(f"Неизвестный уровень сложности: {difficulty}")
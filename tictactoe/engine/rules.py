@@ -0,0 +1,269 @@
+import random
+from functools import lru_cache
+
+X = "X"
+O = "O"
+
+SIZE = 3
+CELLS = SIZE * SIZE
+FULL = (1 << CELLS) - 1
+
+WIN_COMBINATIONS = [
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),  # Горизонтальные
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),  # Вертикальные
+    (0, 4, 8), (2, 4, 6)              # Диагональные
+]
+
+# Каждая линия хранится как битовая маска из трёх клеток
+LINE_MASKS = tuple(sum(1 << cell for cell in combo) for combo in WIN_COMBINATIONS)
+
+
+# Повороты и отражения доски: SYMMETRIES[t][i] - куда переходит клетка i
+def _rotate(cell):
+    row, col = divmod(cell, SIZE)
+    return col * SIZE + (SIZE - 1 - row)
+
+
+def _reflect(cell):
+    row, col = divmod(cell, SIZE)
+    return row * SIZE + (SIZE - 1 - col)
+
+
+def _build_symmetries():
+    symmetries = []
+    perm = list(range(CELLS))
+    for _ in range(4):
+        symmetries.append(tuple(perm))
+        symmetries.append(tuple(_reflect(cell) for cell in perm))
+        perm = [_rotate(cell) for cell in perm]
+    return tuple(symmetries)
+
+
+SYMMETRIES = _build_symmetries()
+
+# Маска без младшей клетки уже посчитана - достаточно добавить образ этой клетки
+def _build_transform(perm):
+    table = [0] * (FULL + 1)
+    for mask in range(1, FULL + 1):
+        low = mask & -mask
+        table[mask] = table[mask ^ low] | 1 << perm[low.bit_length() - 1]
+    return tuple(table)
+
+
+# TRANSFORMS[t][mask] - маска после применения симметрии t
+TRANSFORMS = tuple(_build_transform(perm) for perm in SYMMETRIES)
+
+
+# INVERSE[t][c] - клетка исходной доски, которая переходит в клетку c
+INVERSE = tuple(
+    tuple(perm.index(cell) for cell in range(CELLS))
+    for perm in SYMMETRIES
+)
+
+
+def canonical(first, second):
+    return min((table[first] << CELLS) | table[second] for table in TRANSFORMS)
+
+
+def canonical_transform(first, second):
+    return min(((table[first] << CELLS) | table[second], t) for t, table in enumerate(TRANSFORMS))
+
+
+def has_line(mask):
+    for line in LINE_MASKS:
+        if mask & line == line:
+            return True
+    return False
+
+
+# Направления линий: вправо, вниз, вниз-вправо, вниз-влево
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+class Geometry:
+    __slots__ = ("size", "k", "cells", "full", "lines", "cell_lines", "zobrist_x", "zobrist_o")
+
+    def __init__(self, size, k):
+        if size < 1 or not 1 <= k <= size:
+            raise ValueError(f"Некорректный размер доски {size}x{size} для {k} в ряд")
+        self.size = size
+        self.k = k
+        self.cells = size * size
+        self.full = (1 << self.cells) - 1
+
+        lines = []
+        # Для каждой клетки - только линии, которые через неё проходят
+        cell_lines = [[] for _ in range(self.cells)]
+        for row in range(size):
+            for col in range(size):
+                for d_row, d_col in DIRECTIONS:
+                    end_row = row + d_row * (k - 1)
+                    end_col = col + d_col * (k - 1)
+                    if 0 <= end_row < size and 0 <= end_col < size:
+                        line_cells = [(row + d_row * i) * size + col + d_col * i for i in range(k)]
+                        line = sum(1 << cell for cell in line_cells)
+                        lines.append(line)
+                        for cell in line_cells:
+                            cell_lines[cell].append(line)
+        self.lines = tuple(lines)
+        self.cell_lines = tuple(tuple(through) for through in cell_lines)
+
+        # Ключи Зобриста зависят только от размера доски, чтобы совпадать у всех участников
+        keys = random.Random(f"zobrist:{size}")
+        self.zobrist_x = tuple(keys.getrandbits(64) for _ in range(self.cells))
+        self.zobrist_o = tuple(keys.getrandbits(64) for _ in range(self.cells))
+
+    def zobrist(self, x, o):
+        key = 0
+        for cell in range(self.cells):
+            if x >> cell & 1:
+                key ^= self.zobrist_x[cell]
+            elif o >> cell & 1:
+                key ^= self.zobrist_o[cell]
+        return key
+
+    def wins_through(self, mask, cell):
+        for line in self.cell_lines[cell]:
+            if mask & line == line:
+                return True
+        return False
+
+    def has_line(self, mask):
+        for line in self.lines:
+            if mask & line == line:
+                return True
+        return False
+
+
+@lru_cache(maxsize=None)
+def _geometry(size, k):
+    return Geometry(size, k)
+
+
+def geometry(size=SIZE, k=None):
+    return _geometry(size, min(size, 5) if k is None else k)
+
+
+_UNKNOWN = object()
+
+
+class Board:
+    __slots__ = ("geometry", "x", "o", "zobrist", "_winner")
+
+    def __init__(self, x=0, o=0, size=SIZE, k=None):
+        geo = geometry(size, k)
+        object.__setattr__(self, "geometry", geo)
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "o", o)
+        object.__setattr__(self, "zobrist", geo.zobrist(x, o) if x or o else 0)
+        object.__setattr__(self, "_winner", None if not x and not o else _UNKNOWN)
+
+    @classmethod
+    def _make(cls, geometry, x, o, zobrist, winner):
+        board = object.__new__(cls)
+        object.__setattr__(board, "geometry", geometry)
+        object.__setattr__(board, "x", x)
+        object.__setattr__(board, "o", o)
+        object.__setattr__(board, "zobrist", zobrist)
+        object.__setattr__(board, "_winner", winner)
+        return board
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Board is immutable")
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Board)
+            and self.geometry is other.geometry
+            and self.x == other.x
+            and self.o == other.o
+        )
+
+    def __hash__(self):
+        return hash((self.geometry.size, self.geometry.k, self.x, self.o))
+
+    def __repr__(self):
+        return f"Board(x={self.x:#x}, o={self.o:#x}, size={self.size}, k={self.k})"
+
+    @property
+    def size(self):
+        return self.geometry.size
+
+    @property
+    def k(self):
+        return self.geometry.k
+
+    @property
+    def cells(self):
+        return self.geometry.cells
+
+    @property
+    def occupied(self):
+        return self.x | self.o
+
+    @property
+    def turn(self):
+        return X if self.x.bit_count() == self.o.bit_count() else O
+
+    def cell(self, index):
+        bit = 1 << index
+        if self.x & bit:
+            return X
+        if self.o & bit:
+            return O
+        return ""
+
+    def is_empty(self, index):
+        return not self.occupied >> index & 1
+
+    def moves(self):
+        free = self.geometry.full & ~self.occupied
+        moves = []
+        while free:
+            low = free & -free
+            moves.append(low.bit_length() - 1)
+            free ^= low
+        return moves
+
+    def play(self, index):
+        geometry = self.geometry
+        if not 0 <= index < geometry.cells or (self.x | self.o) >> index & 1:
+            raise ValueError(f"Клетка {index} недоступна")
+        # Ходы после победы не проверяются на старые линии, поэтому запрещены
+        if self._winner is not None and self.winner() is not None:
+            raise ValueError("Партия уже закончена")
+        bit = 1 << index
+        # Новая линия может пройти только через поставленный камень
+        if self.x.bit_count() == self.o.bit_count():
+            x = self.x | bit
+            winner = X if geometry.wins_through(x, index) else None
+            return Board._make(geometry, x, self.o, self.zobrist ^ geometry.zobrist_x[index], winner)
+        o = self.o | bit
+        winner = O if geometry.wins_through(o, index) else None
+        return Board._make(geometry, self.x, o, self.zobrist ^ geometry.zobrist_o[index], winner)
+
+    def undo(self, index):
+        bit = 1 << index
+        if not self.occupied & bit:
+            raise ValueError(f"Клетка {index} пуста")
+        winner = None if self._winner is None else _UNKNOWN
+        keys = self.geometry.zobrist_x if self.x & bit else self.geometry.zobrist_o
+        return Board._make(self.geometry, self.x & ~bit, self.o & ~bit, self.zobrist ^ keys[index], winner)
+
+    def winner(self):
+        winner = self._winner
+        if winner is _UNKNOWN:
+            if self.geometry.has_line(self.x):
+                winner = X
+            elif self.geometry.has_line(self.o):
+                winner = O
+            else:
+                winner = None
+            object.__setattr__(self, "_winner", winner)
+        return winner
+
+    def is_full(self):
+        return self.occupied == self.geometry.full
+
+    def is_over(self):
+        return self.is_full() or self.winner() is not None
@@ -0,0 +1,115 @@
+import time
+
+from .. import metrics
+from .rules import CELLS, SIZE, X, canonical, has_line
+
+# Центр, затем углы, затем края
+MOVE_ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+WIN = CELLS + 1
+
+
+class Solver:
+    def __init__(self):
+        self.table = {}
+        self.nodes = 0
+
+    def clear(self):
+        self.table.clear()
+        self.nodes = 0
+
+    # Возвращает (ход, оценка) для стороны, которая ходит.
+    # Оценка > 0 - выигрыш (чем быстрее, тем больше), 0 - ничья, < 0 - проигрыш.
+    def solve(self, board):
+        if board.size != SIZE or board.k != SIZE:
+            raise ValueError(f"Полный перебор поддерживается только для доски {SIZE}x{SIZE}")
+        if board.is_over():
+            return None, self.score(board)
+        started = metrics.enabled and time.perf_counter()
+        nodes = self.nodes
+
+        me, opp = (board.x, board.o) if board.turn == X else (board.o, board.x)
+        occupied = me | opp
+        best_move, best_score = None, -WIN - 1
+        alpha, beta = -WIN, WIN
+        for move in MOVE_ORDER:
+            bit = 1 << move
+            if occupied & bit:
+                continue
+            score = -self.negamax(opp, me | bit, -beta, -alpha)
+            if score > best_score:
+                best_move, best_score = move, score
+            if score > alpha:
+                alpha = score
+        if started:
+            metrics.elapsed("solver.solve_us", started)
+            metrics.observe("solver.nodes", self.nodes - nodes)
+        return best_move, best_score
+
+    def score(self, board):
+        winner = board.winner()
+        if winner is None:
+            return 0
+        stones = board.occupied.bit_count()
+        return -(WIN - stones) if winner != board.turn else WIN - stones
+
+    def negamax(self, me, opp, alpha, beta):
+        self.nodes += 1
+
+        occupied = me | opp
+        stones = occupied.bit_count()
+        # Соперник только что сходил - проверяем только его линии
+        if has_line(opp):
+            return -(WIN - stones)
+        if stones == CELLS:
+            return 0
+
+        key = canonical(me, opp)
+        entry = self.table.get(key)
+        if entry is not None:
+            value, flag = entry
+            if flag == EXACT:
+                return value
+            if flag == LOWER and value >= beta:
+                return value
+            if flag == UPPER and value <= alpha:
+                return value
+
+        original_alpha = alpha
+        best = -WIN
+        for move in MOVE_ORDER:
+            bit = 1 << move
+            if occupied & bit:
+                continue
+            score = -self.negamax(opp, me | bit, -beta, -alpha)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best <= original_alpha:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (best, flag)
+        return best
+
+
+_solver = Solver()
+
+
+# Точные оценки всех ходов {ход: оценка} общим решателем процесса (одна таблица транспозиций на всех)
+def move_values(board):
+    values = {}
+    for move in board.moves():
+        child = board.play(move)
+        values[move] = -(_solver.score(child) if child.is_over() else _solver.solve(child)[1])
+    return values
@@ -0,0 +1,318 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+
+from .rules import X, Board, geometry
+
+TABLEBASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MAGIC = b"XOTB\x01"
+# Размер доски, число в ряд, признак законченной сборки
+HEADER = struct.Struct(">5sBBB")
+
+# Результат для стороны, которая ходит (как в book.py), в старших битах; в младших - ходов до конца партии
+WIN = 1
+DRAW = 2
+LOSS = 3
+MISSING = 0
+
+DISTANCE_BITS = 5
+DISTANCE_MASK = (1 << DISTANCE_BITS) - 1
+SCALE = 1 << DISTANCE_BITS
+
+# Таблица на все 3**клеток позиций: 4x4 - 43 МБ, 5x5 - уже 847 ГБ
+MAX_CELLS = 16
+CHUNK = 1 << 16
+
+EMPTY = 0
+X_STONE = 1
+O_STONE = 2
+
+_tables = {}
+
+
+def path_for(size, k, directory=TABLEBASE_DIR):
+    return os.path.join(directory, f"tablebase{size}x{size}k{k}.bin")
+
+
+def table_size(cells):
+    return 3 ** cells
+
+
+def check_geometry(geo):
+    if geo.cells > MAX_CELLS:
+        raise ValueError(
+            f"Таблица для доски {geo.size}x{geo.size} заняла бы {table_size(geo.cells) / 1e9:.0f} ГБ, "
+            f"поддерживается не больше {MAX_CELLS} клеток"
+        )
+
+
+# TERNARY[mask] - сумма 3**клетка по клеткам маски; номер позиции = TERNARY[x] + 2 * TERNARY[o]
+def _build_ternary(cells):
+    table = [0] * (1 << cells)
+    for mask in range(1, 1 << cells):
+        low = mask & -mask
+        table[mask] = table[mask ^ low] + 3 ** (low.bit_length() - 1)
+    return table
+
+
+class Tablebase:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, size, k, complete = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Неизвестный формат таблицы: {magic!r}")
+        self.size = size
+        self.k = k
+        self.complete = complete
+        self.cells = size * size
+        self.ternary = _build_ternary(self.cells)
+        self.powers = tuple(3 ** cell for cell in range(self.cells))
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def supports(self, board):
+        return board.size == self.size and board.k == self.k
+
+    def entry(self, index):
+        return self.data[HEADER.size + index]
+
+    def index(self, board):
+        return self.ternary[board.x] + 2 * self.ternary[board.o]
+
+    # Возвращает (результат, ходов до конца) для стороны, которая ходит
+    def probe(self, board):
+        entry = self.entry(self.index(board))
+        if entry == MISSING:
+            raise KeyError(f"Позиции нет в таблице: {board!r}")
+        return entry >> DISTANCE_BITS, entry & DISTANCE_MASK
+
+    # Оценки всех ходов {ход: оценка}: > 0 - выигрыш (чем быстрее, тем больше), 0 - ничья, < 0 - проигрыш
+    def move_values(self, board):
+        index = self.index(board)
+        stone = X_STONE if board.turn == X else O_STONE
+        return {move: -_score(self.entry(index + stone * self.powers[move])) for move in board.moves()}
+
+    # Самый быстрый выигрыш, иначе ничья, иначе самый долгий проигрыш
+    def best_move(self, board):
+        values = self.move_values(board)
+        return max(values, key=values.__getitem__) if values else None
+
+
+def _score(entry):
+    outcome = entry >> DISTANCE_BITS
+    if outcome == WIN:
+        return SCALE - (entry & DISTANCE_MASK)
+    if outcome == LOSS:
+        return (entry & DISTANCE_MASK) - SCALE
+    if outcome == DRAW:
+        return 0
+    # Недостижимая позиция никогда не выбирается
+    return SCALE + 1
+
+
+# Открытая таблица для (size, k) или None, если она не собрана
+def load(size, k, directory=TABLEBASE_DIR):
+    key = (size, k, directory)
+    if key not in _tables:
+        table = None
+        path = path_for(size, k, directory)
+        if os.path.exists(path):
+            table = Tablebase(path)
+            if not table.complete:
+                table.close()
+                table = None
+        _tables[key] = table
+    return _tables[key]
+
+
+def unload():
+    for table in _tables.values():
+        if table is not None:
+            table.close()
+    _tables.clear()
+
+
+# Слой n - позиции с n камнями, у X столько же камней, сколько у O, или на один больше
+def _layers(cells):
+    import numpy as np
+
+    stones = np.zeros(1, np.uint8)
+    balance = np.zeros(1, np.int8)
+    # Новая клетка - старший троичный разряд: пусто, X, O
+    for _ in range(cells):
+        stones = np.concatenate((stones, stones + 1, stones + 1))
+        balance = np.concatenate((balance, balance + 1, balance - 1))
+    return np.where(balance == (stones & 1), stones, 255).astype(np.uint8)
+
+
+# Выполняется в рабочем процессе: слой layer + 1 уже посчитан и лежит в файле
+def _solve_chunk(path, size, k, layer, positions):
+    import numpy as np
+
+    from .batch import line_indices
+
+    cells = size * size
+    table = np.memmap(path, np.uint8, "r+", offset=HEADER.size, shape=(table_size(cells),))
+    scores = np.array([_score(entry) for entry in range(256)], np.int16)
+
+    digits = np.empty((cells, len(positions)), np.uint8)
+    rest = positions.copy()
+    for cell in range(cells):
+        digits[cell] = rest % 3
+        rest //= 3
+
+    mover = X_STONE if layer % 2 == 0 else O_STONE
+    last = O_STONE if mover == X_STONE else X_STONE
+    lines = digits[line_indices(size, k)]
+    lost = (lines == last).all(axis=1).any(axis=0)
+    # Линия у того, кто ходит, при ходе соперника - в партии такого не бывает
+    impossible = (lines == mover).all(axis=1).any(axis=0)
+
+    best = np.full(len(positions), -SCALE - 1, np.int16)
+    for cell in range(cells):
+        empty = np.flatnonzero(digits[cell] == EMPTY)
+        if empty.size:
+            children = table[positions[empty] + mover * 3 ** cell]
+            best[empty] = np.maximum(best[empty], -scores[children])
+
+    # Выигрыш и проигрыш отодвигаются на один ход
+    best = np.where(best > 0, best - 1, np.where(best < 0, best + 1, 0))
+    entries = np.where(
+        best > 0,
+        (WIN << DISTANCE_BITS) | (SCALE - best),
+        np.where(best < 0, (LOSS << DISTANCE_BITS) | (SCALE + best), (DRAW << DISTANCE_BITS) | (cells - layer)),
+    ).astype(np.uint8)
+    if layer == cells:
+        entries[:] = DRAW << DISTANCE_BITS
+    entries[lost] = LOSS << DISTANCE_BITS
+    entries[impossible] = MISSING
+
+    table[positions] = entries
+    table.flush()
+    del table
+    return len(positions)
+
+
+def _create(path, size, k, cells):
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, size, k, 0))
+        f.truncate(HEADER.size + table_size(cells))
+
+
+def _checkpoints(path):
+    done = set()
+    try:
+        with open(path) as f:
+            for line in f:
+                layer, chunk = line.split()
+                done.add((int(layer), int(chunk)))
+    except OSError:
+        pass
+    return done
+
+
+# Слои собираются от полной доски к пустой; после каждой порции в path.ckpt дописывается её номер,
+# поэтому прерванную сборку можно продолжить с того же места
+def build(size, k, path=None, workers=None, chunk=CHUNK, log=None):
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    import numpy as np
+
+    geo = geometry(size, k)
+    check_geometry(geo)
+    path = path or path_for(size, k)
+    checkpoint = path + ".ckpt"
+
+    done = _checkpoints(checkpoint)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            magic, old_size, old_k, complete = HEADER.unpack(f.read(HEADER.size))
+        if magic == MAGIC and (old_size, old_k) == (size, k) and complete:
+            return {"positions": count_positions(path), "chunks": 0, "resumed": 0, "elapsed": 0.0}
+        if magic != MAGIC or (old_size, old_k) != (size, k) or not done:
+            done = set()
+    else:
+        # Контрольная точка без самой таблицы ничего не стоит
+        done = set()
+    if not done:
+        _create(path, size, k, geo.cells)
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+    started = time.perf_counter()
+    codes = _layers(geo.cells)
+    solved = 0
+    with ProcessPoolExecutor(workers or os.cpu_count() or 1) as pool, open(checkpoint, "a") as progress:
+        for layer in range(geo.cells, -1, -1):
+            positions = np.flatnonzero(codes == layer)
+            futures = {}
+            for number, start in enumerate(range(0, len(positions), chunk)):
+                if (layer, number) in done:
+                    continue
+                futures[pool.submit(_solve_chunk, path, size, k, layer, positions[start:start + chunk])] = number
+            while futures:
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    future.result()
+                    progress.write(f"{layer} {futures.pop(future)}\n")
+                    progress.flush()
+                    solved += 1
+            if log:
+                print(f"слой {layer:2d}: позиций {len(positions)}, {time.perf_counter() - started:.1f} с", file=log, flush=True)
+
+    with open(path, "r+b") as f:
+        f.write(HEADER.pack(MAGIC, size, k, 1))
+    os.remove(checkpoint)
+    _tables.clear()
+    return {
+        "positions": count_positions(path),
+        "chunks": solved,
+        "resumed": len(done),
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def count_positions(path):
+    import numpy as np
+
+    table = np.memmap(path, np.uint8, "r", offset=HEADER.size)
+    return int(np.count_nonzero(table))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ретроградная сборка таблицы эндшпиля для доски до 4x4")
+    parser.add_argument("--size", type=int, default=4)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--path", help="файл таблицы (по умолчанию рядом с модулем)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk", type=int, default=CHUNK, help="позиций на одно задание")
+    args = parser.parse_args(argv)
+
+    path = args.path or path_for(args.size, args.k)
+    try:
+        result = build(args.size, args.k, path, args.workers, args.chunk, log=sys.stdout)
+    except ValueError as e:
+        print(f"Ошибка: {e}")
+        return
+    table = Tablebase(path)
+    outcome, distance = table.probe(Board(0, 0, args.size, args.k))
+    table.close()
+    names = {WIN: "выигрыш X", DRAW: "ничья", LOSS: "проигрыш X"}
+    print(
+        f"{args.size}x{args.size}, {args.k} в ряд: позиций {result['positions']}, "
+        f"файл {os.path.getsize(path) / 1e6:.1f} МБ, сборка {result['elapsed']:.1f} с "
+        f"(порций {result['chunks']}, из контрольной точки {result['resumed']})"
+    )
+    print(f"пустая доска: {names[outcome]} за {distance} ходов")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,928 @@
+import os
+import sys
+import threading
+import time
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QDesktopWidget, QDialog, QInputDialog, QHBoxLayout, QLineEdit, QComboBox
+from PyQt5.QtNetwork import QTcpServer, QTcpSocket, QHostAddress
+from PyQt5.QtGui import QPalette, QColor, QFont, QIntValidator, QPainter, QPen
+from PyQt5.QtCore import QObject, QRect, QRunnable, QSize, QThreadPool, QTimer, Qt, pyqtSignal
+
+from . import metrics, protocol, record
+from .engine import Board, players
+
+class ConnectionDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.setWindowTitle("Введите IP-адрес и порт")
+        self.setGeometry(0, 0, 300, 150)
+        self.setFixedSize(self.size())
+
+        layout = QVBoxLayout()
+
+        label_info = QLabel("Введите IP-адрес и порт в формате 'IP:порт'", self)
+        self.edit_ip_port = QLineEdit(self)
+        self.edit_ip_port.setPlaceholderText("Пример: 127.0.0.1:1234")
+
+        layout.addWidget(label_info)
+        layout.addWidget(self.edit_ip_port)
+
+        button_layout = QHBoxLayout()
+
+        self.btn_connect = QPushButton("Подключиться", self)
+        self.btn_connect.clicked.connect(self.accept_connection)
+        button_layout.addWidget(self.btn_connect)
+
+        self.btn_cancel = QPushButton("Отмена", self)
+        self.btn_cancel.clicked.connect(self.reject)
+        button_layout.addWidget(self.btn_cancel)
+
+        layout.addLayout(button_layout)
+
+        self.setLayout(layout)
+
+        self.move_to_center()
+
+    def move_to_center(self):
+        screen_center = QDesktopWidget().screenGeometry().center()
+        self.move(screen_center - self.rect().center())
+
+    def accept_connection(self):
+        ip_port_text = self.edit_ip_port.text()
+
+        if ":" not in ip_port_text:
+            print("Введите IP-адрес и порт в формате 'IP:порт'")
+            return
+
+        ip, port = ip_port_text.split(":", 1)
+
+        if not ip or not port.isdigit():
+            print("Введите корректный IP-адрес и порт.")
+            return
+
+        self.accept()
+
+    def get_connection_info(self):
+        ip_port_text = self.edit_ip_port.text()
+        ip, port = ip_port_text.split(":", 1)
+        return ip, int(port) if port.isdigit() else 0
+
+class NetworkServer(QTcpServer):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.new_connection = None
+
+    def incomingConnection(self, socket_descriptor):
+        if self.new_connection:
+            self.new_connection(socket_descriptor)
+
+    def listen(self, address, port):
+        return super().listen(QHostAddress(address), port)
+
+    def closeServer(self):
+        if self.isListening():
+            self.close()
+
+
+class NetworkClient(QTcpSocket):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.ready_read = self.readyRead
+
+
+class AiSignals(QObject):
+    move_ready = pyqtSignal(object, int)
+
+
+# Поиск хода в отдельном потоке; cancel() просит поиск остановиться, результат отменённого поиска не отправляется
+class AiWorker(QRunnable):
+    def __init__(self, player, board):
+        super().__init__()
+        self.player = player
+        self.board = board
+        self.cancelled = threading.Event()
+        self.signals = AiSignals()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def run(self):
+        if self.cancelled.is_set():
+            return
+        started = metrics.enabled and time.perf_counter()
+        try:
+            move = self.player.choose_move(self.board, self.cancelled)
+            if started:
+                metrics.elapsed("ai.move_us", started)
+        except Exception as error:
+            print("Ошибка поиска хода:", error)
+            move = None
+        if not self.cancelled.is_set():
+            self.signals.move_ready.emit(self.board, -1 if move is None else move)
+
+
+# Вся доска - один виджет: клетка по координатам клика, после хода перерисовывается только она
+class BoardWidget(QWidget):
+    MIN_CELL = 12
+    COLORS = {"X": QColor(30, 80, 200), "O": QColor(200, 40, 40)}
+
+    cell_clicked = pyqtSignal(int, int)
+
+    def __init__(self, board, cell_size, parent=None):
+        super().__init__(parent)
+        self.board = board
+        self.cell_size = cell_size
+        self.active = True
+        self.setMinimumSize(board.size * self.MIN_CELL, board.size * self.MIN_CELL)
+
+    def sizeHint(self):
+        side = self.board.size * self.cell_size
+        return QSize(side, side)
+
+    # Сторона клетки и левый верхний угол доски: доска квадратная и стоит по центру
+    def metrics(self):
+        size = self.board.size
+        cell = max(1, min(self.width(), self.height()) // size)
+        return cell, (self.width() - cell * size) // 2, (self.height() - cell * size) // 2
+
+    def cell_rect(self, index):
+        cell, left, top = self.metrics()
+        row, col = divmod(index, self.board.size)
+        return QRect(left + col * cell, top + row * cell, cell, cell)
+
+    # cells - клетки, которые изменились; None - перерисовать всё
+    def set_board(self, board, cells=None):
+        self.board = board
+        if cells is None:
+            self.update()
+            return
+        for index in cells:
+            self.update(self.cell_rect(index))
+
+    def mousePressEvent(self, event):
+        if not self.active or event.button() != Qt.LeftButton:
+            return
+        cell, left, top = self.metrics()
+        size = self.board.size
+        col = (event.x() - left) // cell
+        row = (event.y() - top) // cell
+        if 0 <= row < size and 0 <= col < size:
+            self.cell_clicked.emit(row, col)
+
+    def paintEvent(self, event):
+        board = self.board
+        size = board.size
+        cell, left, top = self.metrics()
+        rect = event.rect()
+        painter = QPainter(self)
+        palette = self.palette()
+        painter.fillRect(rect, palette.window())
+        painter.fillRect(rect & QRect(left, top, cell * size + 1, cell * size + 1), palette.base())
+
+        # Рисуем только клетки, задетые областью перерисовки
+        first_col = max(0, (rect.left() - left) // cell)
+        last_col = min(size - 1, (rect.right() - left) // cell)
+        first_row = max(0, (rect.top() - top) // cell)
+        last_row = min(size - 1, (rect.bottom() - top) // cell)
+        if first_col > last_col or first_row > last_row:
+            painter.end()
+            return
+
+        painter.setPen(QPen(palette.mid().color()))
+        y0, y1 = top + first_row * cell, top + (last_row + 1) * cell
+        for col in range(first_col, last_col + 2):
+            painter.drawLine(left + col * cell, y0, left + col * cell, y1)
+        x0, x1 = left + first_col * cell, left + (last_col + 1) * cell
+        for row in range(first_row, last_row + 2):
+            painter.drawLine(x0, top + row * cell, x1, top + row * cell)
+
+        font = QFont(painter.font())
+        font.setPixelSize(max(6, cell * 2 // 3))
+        painter.setFont(font)
+        span = (1 << (last_col - first_col + 1)) - 1
+        for stone, mask in (("X", board.x), ("O", board.o)):
+            painter.setPen(self.COLORS[stone])
+            for row in range(first_row, last_row + 1):
+                bits = mask >> (row * size + first_col) & span
+                while bits:
+                    low = bits & -bits
+                    col = first_col + low.bit_length() - 1
+                    painter.drawText(QRect(left + col * cell, top + row * cell, cell, cell), Qt.AlignCenter, stone)
+                    bits ^= low
+        painter.end()
+
+
+class GameWindow(QWidget):
+    CELL_SIZE = 28
+    AI_PLAYER = "O"
+
+    def __init__(self, mode, network=None, size=3, k=None, difficulty="perfect"):
+        super().__init__()
+
+        self.setWindowTitle("Игра Крестики-нолики")
+        # Маленькая доска крупнее, на больших клетки мельче, чтобы окно помещалось на экран
+        self.cell_size = min(max(self.CELL_SIZE, 240 // size), max(BoardWidget.MIN_CELL, 800 // size))
+        self.setGeometry(0, 0, max(400, size * self.cell_size + 40), max(300, size * self.cell_size + 140))
+
+        screen = QDesktopWidget().screenGeometry()
+        x = (screen.width() - self.width()) // 2
+        y = (screen.height() - self.height()) // 2
+        self.setGeometry(x, y, self.width(), self.height())
+
+        self.mode = mode
+        self.network = network
+        self.game = Board(size=size, k=k)
+        self.moves = []
+        self.current_player = self.game.turn
+        self.difficulty = difficulty
+        self.ai = players.for_difficulty(difficulty, parallel=True)
+        self.ai_worker = None
+        # Один поток на окно: следующий поиск не начнётся, пока отменённый не вернул управление
+        self.ai_pool = QThreadPool(self)
+        self.ai_pool.setMaxThreadCount(1)
+
+        self.label_turn = QLabel(f"Ход игрока {self.current_player}", self)
+        self.label_local_player = QLabel("", self) 
+        self.winner_label = QLabel("", self)
+
+        self.layout = QVBoxLayout()
+        self.layout.addWidget(self.label_turn)
+        self.layout.addWidget(self.winner_label)
+        self.layout.addWidget(self.label_local_player)
+
+        self.setup_board()
+        self.setup_buttons()
+
+        self.setLayout(self.layout)
+
+    def setup_board(self):
+        self.board_widget = BoardWidget(self.game, self.cell_size, self)
+        self.board_widget.cell_clicked.connect(self.make_move)
+        self.layout.addWidget(self.board_widget, 1)
+
+    def setup_buttons(self):
+
+        self.btn_menu = QPushButton("В меню", self)
+        self.btn_menu.clicked.connect(self.return_to_menu)
+
+        self.btn_new_game = QPushButton("Новая игра", self)
+        self.btn_new_game.clicked.connect(self.new_game)
+
+        self.layout.addWidget(self.btn_menu)
+        self.layout.addWidget(self.btn_new_game)
+
+    def make_move(self, row, col):
+        index = row * self.game.size + col
+        if self.ai_pending or (self.mode == "player_vs_ai" and self.current_player == self.AI_PLAYER):
+            return
+        if not self.game.is_over() and self.game.is_empty(index) and (self.network is None or (hasattr(self.network, 'role') and self.current_player == self.network.role)):
+            started = metrics.enabled and time.perf_counter()
+            self.play(index)
+
+            if self.network:
+                self.network.send_move(row, col, self.game.zobrist)
+            elif self.mode == "player_vs_ai":
+                self.make_ai_move()
+            if started:
+                metrics.elapsed("gui.make_move_us", started)
+
+    def play(self, index):
+        self.game = self.game.play(index)
+        self.moves.append(index)
+        self.render_cell(index)
+        self.check_winner()
+        self.switch_player()
+
+    def apply_remote_move(self, row, col):
+        index = row * self.game.size + col
+        if not self.game.is_over() and self.game.is_empty(index):
+            self.play(index)
+
+    def load_board(self, board):
+        self.cancel_ai_move()
+        self.game = board
+        # Порядок ходов после снимка неизвестен, но для повтора достаточно чередовать X и O
+        x_moves = [index for index in range(board.cells) if board.cell(index) == "X"]
+        o_moves = [index for index in range(board.cells) if board.cell(index) == "O"]
+        self.moves = [index for pair in zip(x_moves, o_moves + [None]) for index in pair if index is not None]
+        self.board_widget.set_board(board)
+        self.board_widget.active = True
+        self.winner_label.clear()
+        self.check_winner()
+        self.switch_player()
+
+    def render_cell(self, index):
+        self.board_widget.set_board(self.game, (index,))
+
+    @property
+    def ai_pending(self):
+        return self.ai_worker is not None
+
+    # Поиск идёт в потоке ai_pool, ход приходит сигналом move_ready
+    def make_ai_move(self):
+        if self.game.is_over() or self.ai_pending:
+            return
+        self.ai_worker = AiWorker(self.ai, self.game)
+        self.ai_worker.signals.move_ready.connect(self.apply_ai_move)
+        self.ai_pool.start(self.ai_worker)
+
+    def cancel_ai_move(self):
+        if self.ai_worker is not None:
+            self.ai_worker.cancel()
+            self.ai_worker = None
+
+    # Ход, посчитанный для доски, которой уже нет (новая партия, отмена), отбрасывается
+    def apply_ai_move(self, board, move):
+        worker = self.ai_worker
+        if worker is None or worker.board is not board:
+            return
+        self.ai_worker = None
+        if board is self.game and move >= 0:
+            self.play(move)
+
+    def check_winner(self):
+        started = metrics.enabled and time.perf_counter()
+        winner = self.game.winner()
+        if started:
+            metrics.elapsed("gui.check_winner_us", started)
+        if winner:
+            self.show_winner(winner)
+            return True
+
+        return False
+
+    def set_local_player_label(self, role):
+        self.label_local_player.setText(f"Вы играете за {role}")
+
+    def show_winner(self, winner):
+        self.winner_label.setText(f"Игрок {winner} победил!")
+        self.winner_label.setStyleSheet("font-size: 18px; color: green; font-weight: bold;")
+
+        self.disable_board()
+
+    # Итог партии, которую сервер или хост уже закрыл (кадр ENDED)
+    def show_result(self, result):
+        if result == record.X_WINS:
+            self.show_winner("X")
+        elif result == record.O_WINS:
+            self.show_winner("O")
+        else:
+            self.winner_label.setText("Ничья" if result == record.DRAW else "Партия уже закончена")
+            self.disable_board()
+
+    def disable_board(self):
+        self.board_widget.active = False
+
+    def switch_player(self):
+        self.current_player = self.game.turn
+        self.label_turn.setText(f"Ход игрока {self.current_player}")
+
+    def return_to_menu(self):
+        self.close()
+
+    def closeEvent(self, event):
+        self.cancel_ai_move()
+        super().closeEvent(event)
+
+    def new_game(self, remote=False):
+        self.cancel_ai_move()
+        previous = self.game
+        self.game = Board(size=previous.size, k=previous.k)
+        self.moves = []
+
+        # Перерисовываем только занятые клетки, а не всю сетку
+        self.board_widget.set_board(self.game, [index for index in range(previous.cells) if not previous.is_empty(index)])
+        self.board_widget.active = True
+
+        self.winner_label.clear()
+        self.switch_player()
+
+        if self.network and not remote:
+            self.network.send_new_game()
+
+        if self.network and self.current_player == "O":
+            self.make_ai_move()
+
+
+class WaitingDialog(QDialog):
+    def __init__(self, parent=None, server_info=None):
+        super().__init__(parent)
+
+        ip_address, port = server_info if server_info else ("", 0)
+
+        self.setWindowTitle("Ожидание соперника")
+        self.setGeometry(0, 0, 400, 150)
+        self.setFixedSize(self.size())
+
+        screen = QDesktopWidget().screenGeometry()
+        x = (screen.width() - self.width()) // 2
+        y = (screen.height() - self.height()) // 2
+        self.move(x, y)
+
+        layout = QVBoxLayout()
+
+        label_waiting = QLabel("Ожидание подключения соперника...", self)
+
+        ip_port_layout = QHBoxLayout()
+
+        self.ip_port_line_edit = QLineEdit(self)
+        self.ip_port_line_edit.setText(f"{ip_address}:{port}")
+        self.ip_port_line_edit.setReadOnly(True)
+        
+        self.ip_port_line_edit.setFrame(False)
+        palette = QPalette()
+        palette.setColor(QPalette.Base, QColor(255, 255, 255, 0)) 
+        self.ip_port_line_edit.setPalette(palette)
+
+        ip_port_layout.addWidget(self.ip_port_line_edit)
+
+        self.btn_copy = QPushButton("Скопировать", self)
+        self.btn_copy.clicked.connect(self.copy_ip_port)
+        ip_port_layout.addWidget(self.btn_copy)
+
+        layout.addWidget(label_waiting)
+        layout.addLayout(ip_port_layout)
+
+        button_layout = QHBoxLayout()
+
+        self.btn_exit = QPushButton("Выйти", self)
+        self.btn_exit.clicked.connect(self.exit_to_menu)
+        button_layout.addWidget(self.btn_exit)
+
+        layout.addLayout(button_layout)
+
+        self.setLayout(layout)
+
+    def exit_to_menu(self):
+        self.close()
+        if self.parent():
+            self.parent().return_to_menu()
+
+    def copy_ip_port(self):
+        clipboard = QApplication.clipboard()
+        ip_port_text = self.ip_port_line_edit.text()
+
+        colon_index = ip_port_text.find(':')
+
+        if colon_index != -1:
+            cleaned_ip_port = ip_port_text[colon_index + 1:]
+        else:
+            cleaned_ip_port = ip_port_text
+
+        clipboard.setText(cleaned_ip_port)
+
+
+...
+
+class NetworkManager(QObject):
+    PORT = 1234
+    RECONNECT_DELAY = 10
+    RECONNECT_MAX_DELAY = 5000
+
+    connection_established = pyqtSignal()
+    connection_progress = pyqtSignal(str)
+    reconnected = pyqtSignal()
+
+    def __init__(self, parent):
+        super().__init__()
+        self.parent = parent
+        self.server = None
+        self.client = None
+        self.role = None
+        self.local_role = None 
+        self.decoder = protocol.FrameDecoder()
+        self.seq = 0
+        self.address = None
+        self.player_name = None
+        self.token = None
+        self.game_number = 0
+        self.established = False
+        self.closing = False
+        self.reconnect_delay = self.RECONNECT_DELAY
+        self.reconnect_pending = False
+
+        self.connection_progress.connect(print)
+
+        self.init_ui()
+
+    def init_ui(self):
+        self.main_menu = self.parent
+
+        layout = QVBoxLayout()
+        btn_host = QPushButton("Host Game", self.parent)
+        btn_join = QPushButton("Join Game", self.parent)
+        btn_match = QPushButton("Find Opponent", self.parent)
+
+        btn_host.clicked.connect(self.host_game)
+        btn_join.clicked.connect(self.join_game)
+        btn_match.clicked.connect(self.find_match)
+
+        layout.addWidget(btn_host)
+        layout.addWidget(btn_join)
+        layout.addWidget(btn_match)
+
+        self.dialog = QDialog(self.parent)
+        self.dialog.setWindowTitle("Network Setup")
+        self.dialog.setLayout(layout)
+
+    def set_role(self, role):
+        self.role = role
+        if self.parent.game_window:
+            self.parent.game_window.set_local_player_label(role) 
+
+    def set_local_role(self, local_role):
+        self.local_role = local_role
+        if self.parent.game_window:
+            self.parent.game_window.set_local_player_label(local_role) 
+
+    def host_game(self):
+        self.server = NetworkServer(self.parent)
+        self.server.new_connection = self.handle_new_connection
+        # Если порт занят (например, второй хост на той же машине), берём любой свободный
+        if self.server.listen(QHostAddress.Any, self.PORT) or self.server.listen(QHostAddress.Any, 0):
+            port = self.server.serverPort()
+            print("Server listening on port", port)
+            self.show_waiting_dialog(port)
+        else:
+            print("Server could not start")
+
+    def join_game(self):
+        connection_dialog = ConnectionDialog(self.parent)
+        if connection_dialog.exec_() == QDialog.Accepted:
+            self.address = connection_dialog.get_connection_info()
+            self.closing = False
+            self.connect_to_host()
+
+    # Подбор соперника по рейтингу на сервере (python -m tictactoe.server); окно игры откроется после START
+    def find_match(self):
+        connection_dialog = ConnectionDialog(self.parent)
+        if connection_dialog.exec_() != QDialog.Accepted:
+            return
+        name, ok = QInputDialog.getText(self.parent, "Подбор соперника", "Имя игрока:")
+        name = name.strip()
+        if not ok or not name:
+            return
+        self.player_name = name
+        self.address = connection_dialog.get_connection_info()
+        self.closing = False
+        self.connection_established.connect(self.main_menu.show_game_window)
+        self.dialog.accept()
+        self.connect_to_host()
+
+    # Подключение не блокирует цикл событий: результат приходит сигналами сокета
+    def connect_to_host(self):
+        self.reconnect_pending = False
+        if self.client:
+            self.client.blockSignals(True)
+            self.client.abort()
+            self.client.deleteLater()
+        ip, port = self.address
+        self.client = NetworkClient(self.parent)
+        self.decoder = protocol.FrameDecoder()
+        self.client.ready_read.connect(self.handle_ready_read)
+        self.client.connected.connect(self.handle_connected)
+        self.client.disconnected.connect(self.handle_connection_lost)
+        self.client.errorOccurred.connect(self.handle_connection_lost)
+        self.connection_progress.emit(f"Подключение к {ip}:{port}...")
+        self.client.connectToHost(ip, port)
+
+    def handle_connected(self):
+        self.reconnect_delay = self.RECONNECT_DELAY
+        if self.token:
+            moves = len(self.parent.game_window.moves) if self.parent.game_window else 0
+            self.send(protocol.encode_resume, self.token, self.game_number, moves)
+            self.connection_progress.emit("Соединение восстановлено")
+            self.reconnected.emit()
+        elif self.player_name:
+            self.send(protocol.encode_queue, self.player_name, 3, 3)
+            self.connection_progress.emit("Поиск соперника...")
+        else:
+            self.send(protocol.encode_join, 3, 3)
+            self.connection_progress.emit("Подключено")
+            self.established = True
+            self.connection_established.emit()
+
+    def handle_connection_lost(self, *args):
+        if self.closing or self.reconnect_pending or self.address is None:
+            return
+        self.reconnect_pending = True
+        delay = self.reconnect_delay
+        self.reconnect_delay = min(self.reconnect_delay * 2, self.RECONNECT_MAX_DELAY)
+        self.connection_progress.emit(f"Соединение потеряно, повтор через {delay} мс")
+        QTimer.singleShot(delay, self.connect_to_host)
+
+    def show_waiting_dialog(self, port):
+        ip_address = "127.0.0.1"  
+        self.waiting_dialog = WaitingDialog(self.parent, (ip_address, port))
+        self.waiting_dialog.show()
+
+    def handle_new_connection(self, socket_descriptor):
+        if self.client:
+            self.client.blockSignals(True)
+            self.client.abort()
+            self.client.deleteLater()
+        self.client = NetworkClient(self.parent)
+        self.decoder = protocol.FrameDecoder()
+        self.client.setSocketDescriptor(socket_descriptor)
+        self.client.ready_read.connect(self.handle_ready_read)
+
+        # Переподключившийся соперник пришлёт RESUME, игра уже идёт
+        if self.established:
+            return
+
+        current_player = self.parent.game_window.current_player if self.parent.game_window else "X"
+        self.set_role("O" if current_player == "X" else "X")
+
+        self.set_local_role("O" if current_player == "X" else "X")
+
+        self.established = True
+        self.connection_established.emit()
+
+        if self.waiting_dialog:
+            self.waiting_dialog.close()
+
+    # TCP может склеить или разрезать кадры, поэтому данные копятся в декодере
+    def handle_ready_read(self):
+        data = bytes(self.client.readAll())
+        started = metrics.enabled and time.perf_counter()
+        try:
+            frames = self.decoder.feed(data)
+        except protocol.ProtocolError as error:
+            self.protocol_error(error)
+            return
+        if started:
+            metrics.elapsed("net.decode_us", started)
+            metrics.count("net.bytes_received", len(data))
+            metrics.count("net.frames_received", len(frames))
+
+        for frame in frames:
+            try:
+                self.handle_frame(frame)
+            except protocol.ProtocolError as error:
+                self.protocol_error(error)
+                return
+
+    # Как и сервер, рвём соединение с нарушителем: недочитанные байты в декодере ничего хорошего не дадут.
+    # Хост продолжает слушать, чтобы соперник мог вернуться с чистым соединением
+    def protocol_error(self, error):
+        print("Ошибка протокола:", error)
+        self.decoder = protocol.FrameDecoder()
+        if not self.server:
+            self.closing = True
+        self.client.abort()
+
+    def handle_frame(self, frame):
+        game_window = self.parent.game_window
+        if frame.type == protocol.MOVE:
+            if game_window:
+                self.receive_move(*protocol.decode_move(frame.payload))
+        elif frame.type == protocol.NEW_GAME:
+            self.game_number += 1
+            if game_window:
+                game_window.new_game(remote=True)
+        elif frame.type == protocol.RESIGN:
+            if game_window:
+                game_window.show_winner(self.local_role or self.role)
+        elif frame.type == protocol.ENDED:
+            # Сессии больше нет: возобновлять нечего, итог - тот, что прислали, а не победа над сдавшимся
+            result = protocol.decode_ended(frame.payload)
+            self.token = None
+            if game_window:
+                game_window.show_result(result)
+        elif frame.type == protocol.SYNC:
+            if not frame.payload:
+                if game_window:
+                    self.send_sync(game_window.game)
+            else:
+                board = protocol.decode_sync(frame.payload)
+                if game_window:
+                    game_window.load_board(board)
+        elif frame.type == protocol.START:
+            # Роль назначает сервер или хост, к которому мы подключились
+            role, size, k = protocol.decode_start(frame.payload)
+            self.set_role(role)
+            self.set_local_role(role)
+            if not self.established:
+                self.established = True
+                self.connection_established.emit()
+        elif frame.type == protocol.JOIN:
+            # Мы хост: соперник играет за другую сторону
+            size, k = protocol.decode_join(frame.payload)
+            peer_role = "X" if self.role == "O" else "O"
+            self.token = os.urandom(protocol.TOKEN_SIZE)
+            self.send(protocol.encode_start, peer_role, size, k)
+            self.send(protocol.encode_session, self.token)
+        elif frame.type == protocol.SESSION:
+            self.token = protocol.decode_session(frame.payload)
+        elif frame.type == protocol.RESUME:
+            self.resume_peer(*protocol.decode_resume(frame.payload))
+        elif frame.type == protocol.ERROR:
+            self.connection_progress.emit(f"Сервер отказал: {protocol.decode_error(frame.payload)}")
+        elif frame.type == protocol.PING:
+            self.send_frame(protocol.PONG, frame.payload)
+        elif frame.type != protocol.PONG:
+            print("Неизвестный тип сообщения:", frame.type)
+
+    # Ход соперника проверяется по очерёдности и занятости клетки, а итог - по хешу Зобриста
+    def receive_move(self, row, col, zobrist):
+        game_window = self.parent.game_window
+        game = game_window.game
+        index = row * game.size + col
+        if 0 <= row < game.size and 0 <= col < game.size and game.cell(index) and game.zobrist == zobrist:
+            # Сервер вернул наш собственный ход - доска уже совпадает
+            return
+        if (
+            game.is_over()
+            or not 0 <= row < game.size
+            or not 0 <= col < game.size
+            or not game.is_empty(index)
+            or game.turn == (self.local_role or self.role)
+        ):
+            self.resync()
+            return
+        game_window.apply_remote_move(row, col)
+        if game_window.game.zobrist != zobrist:
+            self.resync()
+
+    # Хост считается главным: он шлёт свой снимок, клиент просит снимок у хоста или сервера
+    def resync(self):
+        game_window = self.parent.game_window
+        print("Доски разошлись, синхронизация")
+        if self.server:
+            self.send_sync(game_window.game)
+        else:
+            self.send(protocol.encode_sync_request)
+
+    # Мы хост: досылаем сопернику только пропущенные им ходы
+    def resume_peer(self, token, game, seen):
+        game_window = self.parent.game_window
+        if token != self.token or not game_window:
+            # Токен от чужой сессии: итога той партии мы не знаем
+            self.send(protocol.encode_ended, record.ONGOING)
+            return
+        moves = game_window.moves
+        if game == self.game_number & 0xFFFF and seen <= len(moves):
+            board = Board(size=game_window.game.size, k=game_window.game.k)
+            for number, index in enumerate(moves):
+                board = board.play(index)
+                if number >= seen:
+                    self.send_move(*divmod(index, board.size), board.zobrist)
+        else:
+            self.send_sync(game_window.game)
+
+    def send(self, encode, *args):
+        if self.client:
+            self.seq += 1
+            started = metrics.enabled and time.perf_counter()
+            frame = encode(self.seq, *args)
+            if started:
+                metrics.elapsed("net.encode_us", started)
+            self.write(frame)
+
+    # У protocol.encode вид кадра идёт перед номером, поэтому номер подставляется отдельно
+    def send_frame(self, kind, payload=b""):
+        self.send(lambda seq: protocol.encode(kind, seq, payload))
+
+    def write(self, frame):
+        self.client.write(frame)
+        if metrics.enabled:
+            metrics.count("net.bytes_sent", len(frame))
+            metrics.count("net.frames_sent")
+            metrics.observe("net.send_queue_bytes", self.client.bytesToWrite())
+
+    def send_move(self, row, col, zobrist):
+        self.send(protocol.encode_move, row, col, zobrist)
+
+    def send_new_game(self):
+        self.game_number += 1
+        self.send_frame(protocol.NEW_GAME)
+
+    def send_sync(self, board):
+        self.send(protocol.encode_sync, board)
+
+    def disconnect(self):
+        self.closing = True
+        if self.server:
+            self.server.close()
+        elif self.client:
+            self.client.disconnectFromHost()
+
+
+class NetworkSetupDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.setWindowTitle("Настройки сети")
+        self.setGeometry(0, 0, 300, 150)  
+        self.setFixedSize(self.size())  
+
+        screen = QDesktopWidget().screenGeometry()
+        x = (screen.width() - self.width()) // 2
+        y = (screen.height() - self.height()) // 2
+        self.move(x, y)  
+
+        layout = QVBoxLayout()
+
+        btn_host = QPushButton("Стать сервером", self)
+        btn_join = QPushButton("Присоединиться", self)
+
+        btn_host.clicked.connect(self.accept_host)
+        btn_join.clicked.connect(self.accept_join)
+
+        layout.addWidget(btn_host)
+        layout.addWidget(btn_join)
+
+        self.setLayout(layout)
+
+    def accept_host(self):
+        self.accept()
+
+    def accept_join(self):
+        self.accept()
+
+
+DIFFICULTY_NAMES = {
+    "random": "Случайные ходы",
+    "shallow": "Лёгкий",
+    "imperfect": "Средний",
+    "perfect": "Сильный",
+}
+
+
+class MainMenu(QWidget):
+    def __init__(self):
+        super().__init__()
+
+        self.setWindowTitle("Крестики-нолики: Главное меню")
+        self.setGeometry(0, 0, 400, 300)
+
+        screen = QDesktopWidget().screenGeometry()
+        x = (screen.width() - self.width()) // 2
+        y = (screen.height() - self.height()) // 2
+        self.setGeometry(x, y, self.width(), self.height())
+
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+        btn_start = QPushButton("Начать игру", self)
+        btn_ai = QPushButton("Игра против компьютера", self)
+        btn_gomoku = QPushButton("Гомоку 15x15", self)
+        btn_gomoku_ai = QPushButton("Гомоку против компьютера", self)
+        btn_network = QPushButton("Сетевая игра", self)
+        self.difficulty = QComboBox(self)
+        for difficulty in players.DIFFICULTIES:
+            self.difficulty.addItem(DIFFICULTY_NAMES[difficulty], difficulty)
+        self.difficulty.setCurrentIndex(players.DIFFICULTIES.index("perfect"))
+
+        btn_start.clicked.connect(lambda: self.start_game())
+        btn_ai.clicked.connect(lambda: self.start_game(mode="player_vs_ai"))
+        btn_gomoku.clicked.connect(lambda: self.start_game(15, 5))
+        btn_gomoku_ai.clicked.connect(lambda: self.start_game(15, 5, "player_vs_ai"))
+        btn_network.clicked.connect(self.setup_network)
+
+        layout.addWidget(btn_start)
+        layout.addWidget(QLabel("Сложность компьютера:", self))
+        layout.addWidget(self.difficulty)
+        layout.addWidget(btn_ai)
+        layout.addWidget(btn_gomoku)
+        layout.addWidget(btn_gomoku_ai)
+        layout.addWidget(btn_network)
+
+        self.setLayout(layout)
+
+    def start_game(self, size=3, k=None, mode="single"):
+        self.game_window = GameWindow(mode, size=size, k=k, difficulty=self.difficulty.currentData())
+        self.game_window.show()
+
+    def setup_network(self):
+        dialog = NetworkSetupDialog(self)
+        if dialog.exec_() == QDialog.Accepted:
+            network_manager = NetworkManager(self)
+            if dialog.result() == QDialog.Accepted:
+                network_manager.dialog.exec_()
+                network_manager.dialog.accepted.connect(self.show_game_window)
+            else:
+                network_manager.show_waiting_dialog(1234)
+                network_manager.connection_established.connect(self.show_game_window)
+
+    def show_game_window(self):
+        network_manager = self.sender()
+        game_window = GameWindow("network", network_manager)
+        network_manager.parent.game_window = game_window
+        if network_manager.local_role:
+            game_window.set_local_player_label(network_manager.local_role)
+        network_manager.parent.hide()
+        game_window.show()
+
+
+def main():
+    metrics.from_environment()
+    app = QApplication(sys.argv)
+    main_menu = MainMenu()
+    main_menu.show()
+    sys.exit(app.exec_())
+
+
+if __name__ == "__main__":
+    main()
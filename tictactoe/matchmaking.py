@@ -0,0 +1,283 @@
+import bisect
+import heapq
+import itertools
+import math
+import sqlite3
+import time
+from collections import OrderedDict
+
+# Очередь делится на слоты по одному очку рейтинга от SLOT_LOW; рейтинги за краями попадают в крайние слоты
+SLOT_LOW = -1000
+SLOTS = 1 << 13
+# Допустимая разница рейтингов: BASE_WINDOW сразу, дальше растёт на WIDEN_RATE очков в секунду до MAX_WINDOW
+BASE_WINDOW = 50
+WIDEN_RATE = 25
+MAX_WINDOW = 400
+
+DEFAULT_RATING = 1500.0
+K_FACTOR = 32
+# Результаты копятся и применяются пачкой; изменённые рейтинги пишутся в базу одной транзакцией
+RESULT_BATCH = 64
+WRITE_BATCH = 256
+# Сколько игроков читается из базы одним запросом
+READ_BATCH = 500
+
+
+class Ticket:
+    __slots__ = ("player", "rating", "joined", "seq", "payload")
+
+    def __init__(self, player, rating, joined, seq, payload=None):
+        self.player = player
+        self.rating = rating
+        self.joined = joined
+        self.seq = seq
+        self.payload = payload
+
+
+class MatchQueue:
+    def __init__(self, base=BASE_WINDOW, rate=WIDEN_RATE, limit=MAX_WINDOW):
+        self.base = base
+        self.rate = rate
+        self.limit = limit
+        # Слот -> {игрок: билет} в порядке прихода; keys - непустые слоты по возрастанию. Поиск соседей -
+        # O(log SLOTS), вставка и удаление в слоте - O(1), а список слотов сдвигается, только когда слот
+        # появляется или пустеет, и не длиннее SLOTS: от длины очереди ничего не зависит
+        self.slots = {}
+        self.keys = []
+        self.tickets = {}
+        # (время, номер, билет): когда окно билета дорастёт до ближайшего соседа
+        self.due = []
+        self.seq = itertools.count()
+
+    def __len__(self):
+        return len(self.tickets)
+
+    def __contains__(self, player):
+        return player in self.tickets
+
+    def window(self, ticket, now):
+        return min(self.base + self.rate * (now - ticket.joined), self.limit)
+
+    # Возвращает билет соперника или None, если игрок остался ждать
+    def add(self, player, rating, now=None, payload=None):
+        now = time.monotonic() if now is None else now
+        self.remove(player)
+        ticket = Ticket(player, rating, now, next(self.seq), payload)
+        opponent = self._pair(ticket, now)
+        if opponent is None:
+            self._insert(ticket)
+            self._schedule(ticket, now)
+        return opponent
+
+    def remove(self, player):
+        ticket = self.tickets.pop(player, None)
+        if ticket is not None:
+            slot = _slot(ticket.rating)
+            entries = self.slots[slot]
+            del entries[player]
+            if not entries:
+                del self.slots[slot]
+                del self.keys[bisect.bisect_left(self.keys, slot)]
+        return ticket
+
+    # Пары, которые стали возможны из-за расширения окон: [(ждавший дольше, его соперник)]
+    def tick(self, now=None):
+        now = time.monotonic() if now is None else now
+        pairs = []
+        while self.due and self.due[0][0] <= now:
+            _, _, ticket = heapq.heappop(self.due)
+            if self.tickets.get(ticket.player) is not ticket:
+                continue
+            self.remove(ticket.player)
+            opponent = self._pair(ticket, now)
+            if opponent is None:
+                self._insert(ticket)
+                self._schedule(ticket, now)
+            elif opponent.joined <= ticket.joined:
+                pairs.append((opponent, ticket))
+            else:
+                pairs.append((ticket, opponent))
+        return pairs
+
+    def _insert(self, ticket):
+        slot = _slot(ticket.rating)
+        entries = self.slots.get(slot)
+        if entries is None:
+            entries = self.slots[slot] = OrderedDict()
+            bisect.insort(self.keys, slot)
+        entries[ticket.player] = ticket
+        self.tickets[ticket.player] = ticket
+
+    # Кандидаты в соперники: давнее всех ждущий в своём слоте и в ближайших непустых слотах снизу и сверху.
+    # Внутри слота рейтинги отличаются меньше чем на очко, поэтому ближайший по рейтингу может проиграть давнему
+    def _neighbours(self, rating):
+        slot = _slot(rating)
+        keys = self.keys
+        i = bisect.bisect_left(keys, slot)
+        here = self.slots.get(slot)
+        lower = next(iter(self.slots[keys[i - 1]].values())) if i else None
+        if here is not None:
+            i += 1
+        upper = next(iter(self.slots[keys[i]].values())) if i < len(keys) else None
+        return next(iter(here.values())) if here is not None else None, lower, upper
+
+    # Пара подходит, если разница влезает в окно хотя бы одного из двоих: дольше ждавший не ждёт новичка
+    def _pair(self, ticket, now):
+        best, best_gap = None, None
+        for candidate in self._neighbours(ticket.rating):
+            if candidate is None:
+                continue
+            gap = abs(candidate.rating - ticket.rating)
+            if gap <= max(self.window(ticket, now), self.window(candidate, now)) and (best is None or gap < best_gap):
+                best, best_gap = candidate, gap
+        if best is not None:
+            self.remove(best.player)
+        return best
+
+    def _schedule(self, ticket, now):
+        due = None
+        for candidate in self._neighbours(ticket.rating):
+            if candidate is None:
+                continue
+            gap = abs(candidate.rating - ticket.rating)
+            if gap > self.limit:
+                continue
+            at = min(ticket.joined, candidate.joined) + max(gap - self.base, 0) / self.rate
+            if due is None or at < due:
+                due = at
+        if due is not None:
+            heapq.heappush(self.due, (max(due, now + 1e-3), ticket.seq, ticket))
+
+
+def _slot(rating):
+    return min(max(math.floor(rating) - SLOT_LOW, 0), SLOTS - 1)
+
+
+def expected(rating, opponent):
+    return 1 / (1 + 10 ** ((opponent - rating) / 400))
+
+
+class Ratings:
+    def __init__(self, path=":memory:", result_batch=RESULT_BATCH, write_batch=WRITE_BATCH):
+        self.path = path
+        self.result_batch = result_batch
+        self.write_batch = write_batch
+        self.db = sqlite3.connect(path)
+        if path != ":memory:":
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS ratings (player TEXT PRIMARY KEY, rating REAL NOT NULL, games INTEGER NOT NULL)"
+        )
+        self.db.commit()
+        # Игрок -> [рейтинг, партий]; dirty - кого ещё надо записать
+        self.cache = {}
+        self.dirty = set()
+        self.results = []
+        self.writes = 0
+
+    def entry(self, player):
+        entry = self.cache.get(player)
+        if entry is None:
+            row = self.db.execute("SELECT rating, games FROM ratings WHERE player = ?", (player,)).fetchone()
+            entry = self.cache[player] = list(row) if row else [DEFAULT_RATING, 0]
+        return entry
+
+    def rating(self, player):
+        return self.entry(player)[0]
+
+    # Игроки, которых ещё нет в кэше, читаются пачками по READ_BATCH вместо запроса на каждого
+    def load(self, players):
+        missing = list({player for player in players if player not in self.cache})
+        for start in range(0, len(missing), READ_BATCH):
+            part = missing[start:start + READ_BATCH]
+            rows = self.db.execute(
+                f"SELECT player, rating, games FROM ratings WHERE player IN ({', '.join('?' * len(part))})", part
+            )
+            for player, rating, games in rows:
+                self.cache[player] = [rating, games]
+            for player in part:
+                self.cache.setdefault(player, [DEFAULT_RATING, 0])
+
+    # score - очки первого игрока: 1 - победа, 0.5 - ничья, 0 - поражение
+    def report(self, first, second, score):
+        self.results.append((first, second, score))
+        if len(self.results) >= self.result_batch:
+            self.apply()
+
+    # Все изменения пачки считаются от рейтингов до неё, поэтому порядок партий внутри пачки не важен
+    def apply(self):
+        if not self.results:
+            return
+        self.load([player for result in self.results for player in result[:2]])
+        changes = {}
+        for first, second, score in self.results:
+            change = K_FACTOR * (score - expected(self.rating(first), self.rating(second)))
+            changes[first] = changes.get(first, 0.0) + change
+            changes[second] = changes.get(second, 0.0) - change
+        for first, second, _ in self.results:
+            self.cache[first][1] += 1
+            self.cache[second][1] += 1
+        for player, change in changes.items():
+            self.cache[player][0] += change
+            self.dirty.add(player)
+        self.results.clear()
+        if len(self.dirty) >= self.write_batch:
+            self.flush()
+
+    def flush(self):
+        if not self.dirty:
+            return
+        rows = [(player, *self.cache[player]) for player in self.dirty]
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO ratings (player, rating, games) VALUES (?, ?, ?) "
+                "ON CONFLICT(player) DO UPDATE SET rating = excluded.rating, games = excluded.games",
+                rows,
+            )
+        self.writes += 1
+        self.dirty.clear()
+
+    def close(self):
+        self.apply()
+        self.flush()
+        self.db.close()
+
+
+# Отдельная очередь на каждый вариант игры (размер доски, число в ряд), рейтинг общий
+class Matchmaker:
+    def __init__(self, ratings=None):
+        self.ratings = ratings if ratings is not None else Ratings()
+        self.queues = {}
+
+    def __len__(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+    def __contains__(self, player):
+        return any(player in queue for queue in self.queues.values())
+
+    def add(self, variant, player, payload=None, now=None):
+        queue = self.queues.get(variant)
+        if queue is None:
+            queue = self.queues[variant] = MatchQueue()
+        return queue.add(player, self.ratings.rating(player), now, payload)
+
+    # payload задан - игрок убирается, только если в очереди стоит именно он (а не его новое подключение)
+    def remove(self, player, payload=None):
+        for queue in self.queues.values():
+            ticket = queue.tickets.get(player)
+            if ticket is not None and (payload is None or ticket.payload is payload):
+                queue.remove(player)
+
+    # Возвращает [(вариант, первый билет, второй билет)] и применяет накопленные результаты
+    def tick(self, now=None):
+        pairs = []
+        for variant, queue in self.queues.items():
+            for first, second in queue.tick(now):
+                pairs.append((variant, first, second))
+        self.ratings.apply()
+        self.ratings.flush()
+        return pairs
+
+    def close(self):
+        self.ratings.close()
@@ -0,0 +1,176 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+# Выключено по умолчанию. Места замеров проверяют metrics.enabled и ничего больше не делают, пока он False:
+#     started = metrics.enabled and time.perf_counter()
+#     ...
+#     if started:
+#         metrics.elapsed("solver.solve_us", started)
+enabled = False
+
+ENVIRONMENT = "TICTACTOE_METRICS"
+INTERVAL = 10.0
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_histograms = {}
+_dumper = None
+
+
+# Корзины по степеням двойки, каждая поделена на 4: точность около 25%, память O(log max)
+def _bucket(value):
+    value = int(value)
+    if value < 8:
+        return value
+    shift = value.bit_length() - 3
+    return (shift << 3) | (value >> shift)
+
+
+def _upper(bucket):
+    if bucket < 8:
+        return bucket + 1
+    shift = bucket >> 3
+    return ((bucket & 7) + 1) << shift
+
+
+class Histogram:
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = {}
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        bucket = _bucket(value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, fraction):
+        rank = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return max(self.min, min(_upper(bucket), self.max))
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+        }
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def count(name, value=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def gauge(name, value):
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name, value):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.add(value)
+
+
+# Время с момента started (time.perf_counter()) в микросекундах
+def elapsed(name, started):
+    observe(name, (time.perf_counter() - started) * 1e6)
+
+
+def snapshot():
+    with _lock:
+        return {
+            "time": time.time(),
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "histograms": {name: histogram.summary() for name, histogram in _histograms.items()},
+        }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+
+def dump(path):
+    line = json.dumps(snapshot(), ensure_ascii=False)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+class _Dumper(threading.Thread):
+    def __init__(self, path, interval):
+        super().__init__(name="metrics-dump", daemon=True)
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            dump(self.path)
+
+
+# Включает замеры и раз в interval секунд дописывает снимок строкой JSON в path
+def start_dump(path, interval=INTERVAL):
+    global _dumper
+    stop_dump()
+    enable()
+    _dumper = _Dumper(path, interval)
+    _dumper.start()
+    # Последний снимок дописывается при выходе
+    atexit.unregister(stop_dump)
+    atexit.register(stop_dump)
+
+
+def stop_dump():
+    global _dumper
+    if _dumper is not None:
+        _dumper.stopped.set()
+        _dumper.join()
+        dump(_dumper.path)
+        _dumper = None
+
+
+# TICTACTOE_METRICS=путь (и TICTACTOE_METRICS_INTERVAL=секунды) включает замеры без изменения кода
+def from_environment():
+    path = os.environ.get(ENVIRONMENT)
+    if not path:
+        return False
+    start_dump(path, float(os.environ.get(ENVIRONMENT + "_INTERVAL", INTERVAL)))
+    return True
@@ -0,0 +1,216 @@
+import struct
+from collections import namedtuple
+
+from .engine import Board, geometry
+
+# Кадр: длина (4 байта, без учёта самого поля длины), тип (1 байт), номер (4 байта), данные
+HEADER = struct.Struct(">IBI")
+LENGTH = struct.Struct(">I")
+MOVE_PAYLOAD = struct.Struct(">HHQ")
+SYNC_HEADER = struct.Struct(">BB")
+JOIN_PAYLOAD = struct.Struct(">BB")
+START_PAYLOAD = struct.Struct(">cBB")
+TOKEN_SIZE = 16
+RESUME_PAYLOAD = struct.Struct(f">{TOKEN_SIZE}sHH")
+WATCH_PAYLOAD = struct.Struct(">I")
+ENDED_PAYLOAD = struct.Struct(">B")
+QUEUE_HEADER = struct.Struct(">BB")
+MAX_NAME = 32
+
+MAX_FRAME = 1 << 16
+# Больше доски не принимаются ни сервером, ни в снимке: геометрия доски растёт как size^4
+MAX_SIZE = 25
+
+MOVE = 1
+NEW_GAME = 2
+RESIGN = 3
+SYNC = 4
+PING = 5
+PONG = 6
+JOIN = 7
+START = 8
+SESSION = 9
+RESUME = 10
+WATCH = 11
+QUEUE = 12
+ENDED = 13
+ERROR = 14
+
+Frame = namedtuple("Frame", "type seq payload")
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def encode(kind, seq, payload=b""):
+    return HEADER.pack(HEADER.size - LENGTH.size + len(payload), kind, seq & 0xFFFFFFFF) + payload
+
+
+# zobrist - хеш доски после хода: по нему стороны сверяют состояние за O(1)
+def encode_move(seq, row, col, zobrist=0):
+    return encode(MOVE, seq, MOVE_PAYLOAD.pack(row, col, zobrist))
+
+
+def decode_move(payload):
+    if len(payload) != MOVE_PAYLOAD.size:
+        raise ProtocolError(f"Некорректный ход: {len(payload)} байт")
+    return MOVE_PAYLOAD.unpack(payload)
+
+
+# Клиент просит сервер найти соперника для доски size x size, k в ряд
+def encode_join(seq, size=3, k=3):
+    return encode(JOIN, seq, JOIN_PAYLOAD.pack(size, k))
+
+
+def decode_join(payload):
+    if len(payload) != JOIN_PAYLOAD.size:
+        raise ProtocolError("Некорректный запрос на игру")
+    return JOIN_PAYLOAD.unpack(payload)
+
+
+# Сервер (или хост) сообщает, за кого играет клиент
+def encode_start(seq, role, size=3, k=3):
+    return encode(START, seq, START_PAYLOAD.pack(role.encode(), size, k))
+
+
+def decode_start(payload):
+    if len(payload) != START_PAYLOAD.size:
+        raise ProtocolError("Некорректное начало партии")
+    role, size, k = START_PAYLOAD.unpack(payload)
+    return role.decode(), size, k
+
+
+# Токен сессии нужен, чтобы после обрыва вернуться в ту же партию
+def encode_session(seq, token):
+    return encode(SESSION, seq, token)
+
+
+def decode_session(payload):
+    if len(payload) != TOKEN_SIZE:
+        raise ProtocolError("Некорректный токен сессии")
+    return payload
+
+
+# game - сколько раз партия начиналась заново, moves - сколько ходов клиент уже видел
+def encode_resume(seq, token, game, moves):
+    return encode(RESUME, seq, RESUME_PAYLOAD.pack(token, game & 0xFFFF, moves))
+
+
+def decode_resume(payload):
+    if len(payload) != RESUME_PAYLOAD.size:
+        raise ProtocolError("Некорректный запрос на возобновление")
+    return RESUME_PAYLOAD.unpack(payload)
+
+
+# Зритель подписывается на партию; 0 - на последнюю начатую
+def encode_watch(seq, match_id=0):
+    return encode(WATCH, seq, WATCH_PAYLOAD.pack(match_id))
+
+
+def decode_watch(payload):
+    if len(payload) != WATCH_PAYLOAD.size:
+        raise ProtocolError("Некорректный запрос на просмотр")
+    return WATCH_PAYLOAD.unpack(payload)[0]
+
+
+# Подбор соперника по рейтингу: name - имя игрока, под которым сервер хранит его рейтинг
+def encode_queue(seq, name, size=3, k=3):
+    # Обрезка не должна разрезать многобайтовый символ
+    name = name.encode()[:MAX_NAME].decode(errors="ignore").encode()
+    return encode(QUEUE, seq, QUEUE_HEADER.pack(size, k) + name)
+
+
+def decode_queue(payload):
+    if not QUEUE_HEADER.size < len(payload) <= QUEUE_HEADER.size + MAX_NAME:
+        raise ProtocolError("Некорректный запрос на подбор соперника")
+    size, k = QUEUE_HEADER.unpack_from(payload)
+    try:
+        name = payload[QUEUE_HEADER.size:].decode()
+    except UnicodeDecodeError:
+        raise ProtocolError("Имя игрока не в UTF-8")
+    return name, size, k
+
+
+# Ответ на RESUME или WATCH, когда партии уже нет: result - итог из record (X_WINS, O_WINS, DRAW),
+# record.ONGOING - итог неизвестен. В отличие от RESIGN, не значит, что сдался соперник
+def encode_ended(seq, result):
+    return encode(ENDED, seq, ENDED_PAYLOAD.pack(result))
+
+
+def decode_ended(payload):
+    if len(payload) != ENDED_PAYLOAD.size:
+        raise ProtocolError("Некорректный итог партии")
+    return ENDED_PAYLOAD.unpack(payload)[0]
+
+
+# Отказ сервера выполнить запрос (например, повторный JOIN); соединение остаётся открытым
+def encode_error(seq, message):
+    return encode(ERROR, seq, message.encode())
+
+
+def decode_error(payload):
+    return payload.decode(errors="replace")
+
+
+# Пустой SYNC - просьба прислать снимок доски
+def encode_sync_request(seq):
+    return encode(SYNC, seq)
+
+
+def encode_sync(seq, board):
+    width = (board.cells + 7) // 8
+    return encode(
+        SYNC,
+        seq,
+        SYNC_HEADER.pack(board.size, board.k) + board.x.to_bytes(width, "big") + board.o.to_bytes(width, "big"),
+    )
+
+
+def decode_sync(payload):
+    if len(payload) < SYNC_HEADER.size:
+        raise ProtocolError("Слишком короткий снимок доски")
+    size, k = SYNC_HEADER.unpack_from(payload)
+    if size > MAX_SIZE:
+        raise ProtocolError(f"Слишком большая доска в снимке: {size}x{size}")
+    width = (size * size + 7) // 8
+    if len(payload) != SYNC_HEADER.size + 2 * width:
+        raise ProtocolError("Некорректный размер снимка доски")
+    body = payload[SYNC_HEADER.size:]
+    x = int.from_bytes(body[:width], "big")
+    o = int.from_bytes(body[width:], "big")
+    try:
+        full = geometry(size, k).full
+    except ValueError as error:
+        raise ProtocolError(str(error)) from error
+    # Камни не за доской, не в одной клетке, и X ходит первым
+    if x & o or (x | o) & ~full or x.bit_count() - o.bit_count() not in (0, 1):
+        raise ProtocolError("Невозможная позиция в снимке доски")
+    return Board(x, o, size, k)
+
+
+class FrameDecoder:
+    def __init__(self, max_frame=MAX_FRAME):
+        self.buffer = bytearray()
+        self.max_frame = max_frame
+
+    # Принимает любой кусок потока; возвращает все кадры, которые в нём завершились
+    def feed(self, data):
+        buffer = self.buffer
+        buffer += data
+        frames = []
+        offset = 0
+        end = len(buffer)
+        while end - offset >= LENGTH.size:
+            (length,) = LENGTH.unpack_from(buffer, offset)
+            if length < HEADER.size - LENGTH.size or length > self.max_frame:
+                raise ProtocolError(f"Некорректная длина кадра: {length}")
+            frame_end = offset + LENGTH.size + length
+            if frame_end > end:
+                break
+            _, kind, seq = HEADER.unpack_from(buffer, offset)
+            frames.append(Frame(kind, seq, bytes(buffer[offset + HEADER.size:frame_end])))
+            offset = frame_end
+        if offset:
+            del buffer[:offset]
+        return frames
@@ -0,0 +1,178 @@
+import mmap
+import os
+import struct
+from array import array
+from collections import namedtuple
+from itertools import chain
+
+from .engine import X
+
+MAGIC = b"XOGR\x01"
+# Заголовок партии: размер доски, k, результат, число ходов
+RECORD_HEADER = struct.Struct(">BBBH")
+
+ONGOING = 0
+X_WINS = 1
+O_WINS = 2
+DRAW = 3
+
+Game = namedtuple("Game", "size k result moves")
+NIBBLES = [(byte >> 4, byte & 0x0F) for byte in range(256)]
+
+
+def board_result(board):
+    winner = board.winner()
+    if winner is not None:
+        return X_WINS if winner == X else O_WINS
+    return DRAW if board.is_full() else ONGOING
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+# До 16 клеток ход занимает полбайта, до 256 - байт, иначе два байта
+def move_width(size):
+    cells = size * size
+    if cells <= 16:
+        return 0
+    if cells <= 256:
+        return 1
+    return 2
+
+
+def encode_game(size, k, result, moves):
+    width = move_width(size)
+    header = RECORD_HEADER.pack(size, k, result, len(moves))
+    if width == 0:
+        packed = bytearray((len(moves) + 1) // 2)
+        for number, move in enumerate(moves):
+            packed[number >> 1] |= move << 4 if number & 1 == 0 else move
+        return header + bytes(packed)
+    if width == 1:
+        return header + bytes(moves)
+    return header + struct.pack(f">{len(moves)}H", *moves)
+
+
+def moves_size(size, count):
+    width = move_width(size)
+    if width == 0:
+        return (count + 1) // 2
+    return count * width
+
+
+def decode_game(buffer, offset):
+    size, k, result, count = RECORD_HEADER.unpack_from(buffer, offset)
+    start = offset + RECORD_HEADER.size
+    end = start + moves_size(size, count)
+    width = move_width(size)
+    if width == 0:
+        moves = tuple(chain.from_iterable(map(NIBBLES.__getitem__, buffer[start:end])))[:count]
+    elif width == 1:
+        moves = tuple(buffer[start:end])
+    else:
+        moves = struct.unpack_from(f">{count}H", buffer, start)
+    return Game(size, k, result, moves), end
+
+
+class GameWriter:
+    def __init__(self, path, batch=4096):
+        self.path = path
+        self.batch = batch
+        self.pending = []
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "ab")
+        self.index = open(index_path(path), "ab")
+        if new:
+            self.file.write(MAGIC)
+        self.offset = self.file.tell()
+
+    def append(self, size, k, result, moves):
+        record = encode_game(size, k, result, moves)
+        self.pending.append(record)
+        if len(self.pending) >= self.batch:
+            self.flush()
+
+    # Записи копятся в памяти и уходят на диск одним write вместе со смещениями для индекса
+    def flush(self):
+        if not self.pending:
+            return
+        offsets = array("Q")
+        offset = self.offset
+        for record in self.pending:
+            offsets.append(offset)
+            offset += len(record)
+        self.file.write(b"".join(self.pending))
+        self.file.flush()
+        self.index.write(offsets.tobytes())
+        self.index.flush()
+        self.offset = offset
+        self.pending.clear()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _open_map(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# Партии читаются по одной прямо из отображённого в память файла
+def read_games(path):
+    data = _open_map(path)
+    if data is None:
+        return
+    try:
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: это не архив партий")
+        offset = len(MAGIC)
+        end = len(data)
+        # Недописанный хвост (например, после падения процесса) пропускается
+        while offset + RECORD_HEADER.size <= end:
+            size, _, _, count = RECORD_HEADER.unpack_from(data, offset)
+            if offset + RECORD_HEADER.size + moves_size(size, count) > end:
+                break
+            game, offset = decode_game(data, offset)
+            yield game
+    finally:
+        data.close()
+
+
+class GameArchive:
+    def __init__(self, path):
+        self.data = _open_map(path)
+        if self.data is None or self.data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: это не архив партий")
+        self.offsets = array("Q")
+        with open(index_path(path), "rb") as f:
+            self.offsets.frombytes(f.read())
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, number):
+        return decode_game(self.data, self.offsets[number])[0]
+
+    def __iter__(self):
+        for offset in self.offsets:
+            yield decode_game(self.data, offset)[0]
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,193 @@
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import record
+from .engine import O, X, Board, geometry, players
+
+DRAW = 0
+X_WINS = 1
+O_WINS = 2
+
+RESULTS = {None: DRAW, X: X_WINS, O: O_WINS}
+RESULT_NAMES = {DRAW: "draw", X_WINS: "X", O_WINS: "O"}
+RECORD_RESULTS = {DRAW: record.DRAW, X_WINS: record.X_WINS, O_WINS: record.O_WINS}
+
+
+def use_numpy(config):
+    if config["x"] != "random" or config["o"] != "random" or config["no_numpy"]:
+        return False
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# Случайная партия = случайная перестановка клеток, поэтому ходы всех партий делаются разом
+def play_random_batch(count, size, k, seed, keep_moves=False):
+    import numpy as np
+
+    from .engine.batch import line_indices
+
+    geo = geometry(size, k)
+    lines = line_indices(size, k)
+    rng = np.random.default_rng(seed)
+    order = rng.random((count, geo.cells)).argsort(axis=1)
+
+    boards = np.zeros((count, geo.cells), np.int8)
+    winners = np.zeros(count, np.int8)
+    moves = np.zeros(count, np.int16)
+    active = np.arange(count)
+    for ply in range(geo.cells):
+        if not active.size:
+            break
+        player = X_WINS if ply % 2 == 0 else O_WINS
+        boards[active, order[active, ply]] = player
+        moves[active] += 1
+        if ply < 2 * geo.k - 2:
+            continue
+        won = (boards[active][:, lines] == player).all(axis=2).any(axis=1)
+        winners[active[won]] = player
+        active = active[~won]
+    games = None
+    if keep_moves:
+        games = [row[:plies].tolist() for row, plies in zip(order, moves.tolist())]
+    return winners.tolist(), moves.tolist(), None, None, games
+
+
+def play_games(config, start, count):
+    if use_numpy(config):
+        return play_random_batch(count, config["size"], config["k"], config["seed"] + start, config["record"])
+
+    agents = {
+        X: players.create(config["x"], config["budget"], config["seed"] + 2 * start, config["cache"], config["depth"]),
+        O: players.create(config["o"], config["budget"], config["seed"] + 2 * start + 1, config["cache"], config["depth"]),
+    }
+    winners, moves, x_ms, o_ms = [], [], [], []
+    games = [] if config["record"] else None
+    for _ in range(count):
+        board = Board(size=config["size"], k=config["k"])
+        spent = {X: 0.0, O: 0.0}
+        played = []
+        while not board.is_over():
+            turn = board.turn
+            started = time.perf_counter()
+            move = agents[turn].choose_move(board)
+            spent[turn] += time.perf_counter() - started
+            board = board.play(move)
+            played.append(move)
+
+        plies = board.occupied.bit_count()
+        winners.append(RESULTS[board.winner()])
+        moves.append(plies)
+        x_ms.append(spent[X] * 1000 / ((plies + 1) // 2))
+        o_ms.append(spent[O] * 1000 / (plies // 2) if plies > 1 else 0.0)
+        if games is not None:
+            games.append(played)
+    return winners, moves, x_ms, o_ms, games
+
+
+def report(counts, games, elapsed, x_time, o_time, timed, file=None):
+    total = sum(counts.values()) or 1
+    line = (
+        f"игр {total:>10d}/{games}  "
+        f"X {counts[X_WINS] / total:6.1%}  O {counts[O_WINS] / total:6.1%}  ничьих {counts[DRAW] / total:6.1%}  "
+        f"{total / elapsed:12.0f} игр/с"
+    )
+    if timed:
+        line += f"  ход X {x_time / timed:.3f} мс  ход O {o_time / timed:.3f} мс"
+    print(line, file=file, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Партии между ИИ без графического интерфейса")
+    parser.add_argument("--x", choices=players.AGENTS, default="random", help="кто играет крестиками")
+    parser.add_argument("--o", choices=players.AGENTS, default="random", help="кто играет ноликами")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--size", type=int, default=3)
+    parser.add_argument("--k", type=int, default=None)
+    parser.add_argument("--budget", type=float, default=0.01, help="время на ход MCTS, с")
+    parser.add_argument("--depth", type=int, help="глубина поиска deepening вместо бюджета времени")
+    parser.add_argument("--cache", help="каталог кэша оценок deepening на диске, общего для всех процессов")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk", type=int, default=None, help="партий на одно задание")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="записывать каждую партию в CSV (- для stdout)")
+    parser.add_argument("--record", help="дописывать партии в архив (см. record.py)")
+    parser.add_argument("--no-numpy", action="store_true", help="не использовать пакетный режим NumPy")
+    parser.add_argument("--interval", type=float, default=1.0, help="как часто печатать статистику, с")
+    args = parser.parse_args(argv)
+
+    config = {
+        "x": args.x,
+        "o": args.o,
+        "size": args.size,
+        "k": geometry(args.size, args.k).k,
+        "budget": args.budget,
+        "depth": args.depth,
+        "cache": args.cache,
+        "seed": args.seed,
+        "no_numpy": args.no_numpy,
+        "record": bool(args.record),
+    }
+    chunk = args.chunk or (100000 if use_numpy(config) else 100)
+    if args.cache:
+        from .engine import evalcache
+
+        # Один сеанс кэша на весь запуск, общий для всех процессов
+        evalcache.start_run(config["size"], config["k"], args.cache)
+    tasks = [(start, min(chunk, args.games - start)) for start in range(0, args.games, chunk)]
+
+    out = None
+    writer = None
+    if args.csv:
+        out = sys.stdout if args.csv == "-" else open(args.csv, "w", newline="")
+        writer = csv.writer(out)
+        writer.writerow(["game", "winner", "moves", "x_ms", "o_ms"])
+    archive = record.GameWriter(args.record) if args.record else None
+
+    # Если CSV идёт в stdout, статистика уходит в stderr
+    log = sys.stderr if out is sys.stdout else sys.stdout
+    counts = {DRAW: 0, X_WINS: 0, O_WINS: 0}
+    x_time = o_time = 0.0
+    timed = 0
+    started = time.perf_counter()
+    last_report = started
+
+    with ProcessPoolExecutor(args.workers) as pool:
+        futures = {pool.submit(play_games, config, start, count): start for start, count in tasks}
+        for future in as_completed(futures):
+            winners, moves, x_ms, o_ms, games = future.result()
+            for winner in winners:
+                counts[winner] += 1
+            if x_ms is not None:
+                x_time += sum(x_ms)
+                o_time += sum(o_ms)
+                timed += len(x_ms)
+            if writer is not None:
+                start = futures[future]
+                for i, (winner, plies) in enumerate(zip(winners, moves)):
+                    timing = ("", "") if x_ms is None else (f"{x_ms[i]:.4f}", f"{o_ms[i]:.4f}")
+                    writer.writerow([start + i, RESULT_NAMES[winner], plies, *timing])
+            if archive is not None:
+                for winner, played in zip(winners, games):
+                    archive.append(config["size"], config["k"], RECORD_RESULTS[winner], played)
+
+            now = time.perf_counter()
+            if now - last_report >= args.interval:
+                report(counts, args.games, now - started, x_time, o_time, timed, log)
+                last_report = now
+
+    if out is not None and out is not sys.stdout:
+        out.close()
+    if archive is not None:
+        archive.close()
+    report(counts, args.games, time.perf_counter() - started, x_time, o_time, timed, log)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+import argparse
+import asyncio
+import itertools
+import os
+import time
+from collections import OrderedDict
+
+from . import matchmaking, metrics, protocol, record
+from .engine import O, X, Board, geometry
+
+MAX_SIZE = protocol.MAX_SIZE
+RESUME_TIMEOUT = 30.0
+# Итоги закончившихся партий помнятся для стольких токенов: опоздавший с RESUME узнает, чем всё кончилось
+ENDED_SESSIONS = 4096
+# Зрителю, у которого в буфере больше SPECTATOR_BUFFER байт, кадры не пишутся;
+# после MAX_SKIPPED пропущенных кадров он отключается
+SPECTATOR_BUFFER = 64 * 1024
+MAX_SKIPPED = 256
+# Как часто очередь подбора проверяет расширившиеся окна и применяет результаты к рейтингам
+MATCHMAKING_TICK = 0.5
+# Очки X для рейтинга по исходу партии
+SCORES = {record.X_WINS: 1.0, record.O_WINS: 0.0, record.DRAW: 0.5}
+# Счётчики GameServer.traffic по порядку
+TRAFFIC = ("server.frames_received", "server.bytes_received", "server.frames_sent", "server.bytes_sent")
+
+
+class Match:
+    __slots__ = ("id", "board", "players", "names", "spectators", "seq", "moves", "game", "tokens", "timers", "result")
+
+    def __init__(self, match_id, board, x_player, o_player):
+        self.id = match_id
+        self.board = board
+        self.players = {X: x_player, O: o_player}
+        # Имена для рейтинга; после переподключения соединение другое, а имя то же
+        self.names = {X: x_player.player, O: o_player.player}
+        self.spectators = set()
+        self.seq = 0
+        # Ходы текущей партии по порядку - чтобы дослать пропущенное после переподключения
+        self.moves = []
+        self.game = 0
+        self.tokens = {X: os.urandom(protocol.TOKEN_SIZE), O: os.urandom(protocol.TOKEN_SIZE)}
+        self.timers = {}
+        self.result = record.ONGOING
+
+    # Кадр кодируется один раз и те же байты уходят игрокам и всем зрителям
+    def broadcast(self, frame):
+        for player in self.players.values():
+            player.send(frame)
+        for spectator in self.spectators:
+            spectator.send_spectator(frame)
+
+    def next_seq(self):
+        self.seq += 1
+        return self.seq
+
+
+class Connection(asyncio.Protocol):
+    def __init__(self, server):
+        self.server = server
+        self.decoder = protocol.FrameDecoder()
+        self.transport = None
+        self.match = None
+        self.role = None
+        self.watching = None
+        self.player = None
+        # Стоит в ожидании JOIN или в очереди подбора
+        self.queued = False
+        self.paused = False
+        self.skipped = 0
+        self.seq = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.connections.add(self)
+
+    def connection_lost(self, exc):
+        self.server.connections.discard(self)
+        self.server.leave(self)
+
+    def data_received(self, data):
+        started = metrics.enabled and time.perf_counter()
+        try:
+            frames = self.decoder.feed(data)
+        except protocol.ProtocolError:
+            self.transport.close()
+            return
+        if started:
+            metrics.elapsed("server.decode_us", started)
+            traffic = self.server.traffic
+            traffic[0] += len(frames)
+            traffic[1] += len(data)
+        for frame in frames:
+            try:
+                self.server.handle(self, frame)
+            except protocol.ProtocolError:
+                self.transport.close()
+                return
+
+    # Все кадры уходят отсюда; считаются только записанные, пропущенные и на закрытое соединение - нет
+    def send(self, frame):
+        if not self.transport.is_closing():
+            self.transport.write(frame)
+            if metrics.enabled:
+                traffic = self.server.traffic
+                traffic[2] += 1
+                traffic[3] += len(frame)
+
+    def pause_writing(self):
+        self.paused = True
+
+    def resume_writing(self):
+        self.paused = False
+        # Отставший зритель получает свежий снимок вместо пропущенных ходов
+        if self.watching is not None and self.skipped:
+            self.skipped = 0
+            self.send(protocol.encode_sync(self.next_seq(), self.watching.board))
+
+    def send_spectator(self, frame):
+        if not self.paused:
+            self.send(frame)
+            return
+        self.skipped += 1
+        if self.skipped > MAX_SKIPPED:
+            self.transport.close()
+
+    def next_seq(self):
+        self.seq += 1
+        return self.seq
+
+
+class GameServer:
+    def __init__(self, recorder=None, matchmaker=None):
+        self.connections = set()
+        self.waiting = {}
+        self.matches = {}
+        self.match_ids = itertools.count(1)
+        self.sessions = {}
+        self.ended = OrderedDict()
+        self.finished = 0
+        self.recorder = recorder
+        self.matchmaker = matchmaker if matchmaker is not None else matchmaking.Matchmaker()
+        self.traffic = [0] * len(TRAFFIC)
+
+    def handle(self, connection, frame):
+        kind = frame.type
+        if kind == protocol.MOVE:
+            self.move(connection, *protocol.decode_move(frame.payload))
+        elif kind == protocol.JOIN:
+            self.join(connection, *protocol.decode_join(frame.payload))
+        elif kind == protocol.QUEUE:
+            self.queue(connection, *protocol.decode_queue(frame.payload))
+        elif kind == protocol.RESUME:
+            self.resume(connection, *protocol.decode_resume(frame.payload))
+        elif kind == protocol.WATCH:
+            self.watch(connection, protocol.decode_watch(frame.payload))
+        elif kind == protocol.SYNC:
+            if connection.match is not None:
+                connection.send(protocol.encode_sync(connection.next_seq(), connection.match.board))
+        elif kind == protocol.NEW_GAME:
+            self.new_game(connection)
+        elif kind == protocol.RESIGN:
+            self.resign(connection)
+        elif kind == protocol.PING:
+            connection.send(protocol.encode(protocol.PONG, connection.next_seq(), frame.payload))
+
+    # Вариант игры (размер, число в ряд) или None, если игрок ещё не доиграл партию или уже ждёт соперника
+    def variant(self, connection, size, k):
+        if connection.queued:
+            connection.send(protocol.encode_error(connection.next_seq(), "Соперник уже ищется"))
+            return None
+        if connection.match is not None:
+            if not connection.match.board.is_over():
+                connection.send(protocol.encode_error(connection.next_seq(), "Партия ещё не закончена"))
+                return None
+            self.end(connection.match)
+        if size > MAX_SIZE:
+            raise protocol.ProtocolError(f"Слишком большая доска: {size}x{size}")
+        try:
+            return size, geometry(size, k).k
+        except ValueError:
+            raise protocol.ProtocolError(f"Недопустимая доска {size}x{size}, {k} в ряд")
+
+    def join(self, connection, size, k):
+        variant = self.variant(connection, size, k)
+        if variant is None:
+            return
+
+        opponent = self.waiting.pop(variant, None)
+        if opponent is None or opponent.transport.is_closing():
+            self.waiting[variant] = connection
+            connection.queued = True
+            if metrics.enabled:
+                metrics.gauge("server.waiting", len(self.waiting))
+            return
+        self.start(variant, opponent, connection)
+
+    # Подбор по рейтингу: соперник находится сразу или позже, когда окно поиска расширится (см. tick)
+    def queue(self, connection, name, size, k):
+        variant = self.variant(connection, size, k)
+        if variant is None:
+            return
+        # Второй билет с тем же именем молча заменил бы первый, и первое соединение ждало бы вечно
+        if name in self.matchmaker:
+            connection.send(protocol.encode_error(connection.next_seq(), f"Игрок {name} уже ищет соперника"))
+            return
+        connection.player = name
+        connection.queued = True
+        opponent = self.matchmaker.add(variant, name, connection)
+        if metrics.enabled:
+            metrics.gauge("server.queued", len(self.matchmaker))
+        if opponent is not None:
+            self.start(variant, opponent.payload, connection)
+
+    def tick(self):
+        for variant, first, second in self.matchmaker.tick():
+            self.start(variant, first.payload, second.payload)
+        if metrics.enabled:
+            metrics.gauge("server.queued", len(self.matchmaker))
+            self.publish_metrics()
+
+    # Трафик копится в traffic без блокировки (сервер однопоточный) и уходит в metrics раз в тик,
+    # там же снимается очередь на отправку по всем соединениям - а не на каждый кадр
+    def publish_metrics(self):
+        for name, value in zip(TRAFFIC, self.traffic):
+            if value:
+                metrics.count(name, value)
+        self.traffic = [0] * len(TRAFFIC)
+        sizes = [connection.transport.get_write_buffer_size() for connection in self.connections]
+        metrics.gauge("server.write_buffer_bytes", sum(sizes))
+        metrics.gauge("server.write_buffer_max", max(sizes, default=0))
+
+    def start(self, variant, x_player, o_player):
+        size, k = variant
+        match = Match(next(self.match_ids), Board(size=size, k=k), x_player, o_player)
+        self.matches[match.id] = match
+        # Игрок мог ждать и по JOIN, и в очереди подбора: во второй партии ему не место
+        for player in (x_player, o_player):
+            self.unqueue(player)
+        if metrics.enabled:
+            metrics.gauge("server.waiting", len(self.waiting))
+            metrics.gauge("server.matches", len(self.matches))
+        for role, player in match.players.items():
+            player.match = match
+            player.role = role
+            self.sessions[match.tokens[role]] = (match, role)
+            player.send(protocol.encode_start(player.next_seq(), role, size, k))
+            player.send(protocol.encode_session(player.next_seq(), match.tokens[role]))
+
+    def watch(self, connection, match_id):
+        if connection.match is not None:
+            return
+        if match_id == 0 and self.matches:
+            match_id = max(self.matches)
+        match = self.matches.get(match_id)
+        if match is None:
+            connection.send(protocol.encode_ended(connection.next_seq(), record.ONGOING))
+            return
+        if connection.watching is not None:
+            connection.watching.spectators.discard(connection)
+        connection.watching = match
+        connection.transport.set_write_buffer_limits(high=SPECTATOR_BUFFER)
+        match.spectators.add(connection)
+        connection.send(protocol.encode_sync(connection.next_seq(), match.board))
+
+    def resume(self, connection, token, game, seen):
+        session = self.sessions.get(token)
+        if session is None:
+            connection.send(protocol.encode_ended(connection.next_seq(), self.ended.get(token, record.ONGOING)))
+            return
+        match, role = session
+        timer = match.timers.pop(role, None)
+        if timer is not None:
+            timer.cancel()
+        previous = match.players[role]
+        if previous is not connection:
+            previous.match = None
+            previous.transport.close()
+        match.players[role] = connection
+        connection.match = match
+        connection.role = role
+
+        # Досылаем только пропущенные ходы; если партия уже другая - полный снимок
+        if game == match.game & 0xFFFF and seen <= len(match.moves):
+            size = match.board.size
+            for index, zobrist in match.moves[seen:]:
+                connection.send(protocol.encode_move(connection.next_seq(), *divmod(index, size), zobrist))
+        else:
+            connection.send(protocol.encode_sync(connection.next_seq(), match.board))
+
+    # Сервер хранит настоящее состояние партии и пересылает только допустимые ходы
+    def move(self, connection, row, col, zobrist):
+        match = connection.match
+        if match is None:
+            return
+        board = match.board
+        index = row * board.size + col
+        if (
+            board.is_over()
+            or board.turn != connection.role
+            or not 0 <= row < board.size
+            or not 0 <= col < board.size
+            or not board.is_empty(index)
+        ):
+            connection.send(protocol.encode_sync(connection.next_seq(), board))
+            return
+
+        board = match.board = board.play(index)
+        match.moves.append((index, board.zobrist))
+        match.broadcast(protocol.encode_move(match.next_seq(), row, col, board.zobrist))
+        # Хеш клиента после хода не совпал с нашим - он видел другую доску
+        if zobrist != board.zobrist:
+            connection.send(protocol.encode_sync(connection.next_seq(), board))
+        if board.is_over():
+            self.finished += 1
+            self.archive(match, record.board_result(board))
+
+    def new_game(self, connection):
+        match = connection.match
+        if match is None or not match.board.is_over():
+            return
+        match.board = Board(size=match.board.size, k=match.board.k)
+        match.moves = []
+        match.game += 1
+        match.result = record.ONGOING
+        match.broadcast(protocol.encode(protocol.NEW_GAME, match.next_seq()))
+
+    def resign(self, connection):
+        match = connection.match
+        if match is None:
+            return
+        if not match.board.is_over():
+            self.finished += 1
+            self.archive(match, record.O_WINS if connection.role == X else record.X_WINS)
+        match.broadcast(protocol.encode(protocol.RESIGN, match.next_seq()))
+        self.end(match)
+
+    def archive(self, match, result):
+        match.result = result
+        x_name, o_name = match.names[X], match.names[O]
+        if x_name is not None and o_name is not None and x_name != o_name:
+            self.matchmaker.ratings.report(x_name, o_name, SCORES[result])
+        if self.recorder is not None:
+            board = match.board
+            self.recorder.append(board.size, board.k, result, [index for index, _ in match.moves])
+
+    def leave(self, connection):
+        if connection.watching is not None:
+            connection.watching.spectators.discard(connection)
+            connection.watching = None
+        self.unqueue(connection)
+        match = connection.match
+        if match is None:
+            return
+        if match.board.is_over():
+            self.end(match)
+            return
+        # Даём игроку время переподключиться, прежде чем засчитать поражение
+        role = connection.role
+        loop = asyncio.get_running_loop()
+        match.timers[role] = loop.call_later(RESUME_TIMEOUT, self.forfeit, match, role)
+
+    def unqueue(self, connection):
+        if not connection.queued:
+            return
+        connection.queued = False
+        for variant, waiting in list(self.waiting.items()):
+            if waiting is connection:
+                del self.waiting[variant]
+        if connection.player is not None:
+            self.matchmaker.remove(connection.player, connection)
+
+    def forfeit(self, match, role):
+        match.timers.pop(role, None)
+        if self.matches.get(match.id) is match:
+            self.resign(match.players[role])
+
+    def end(self, match):
+        self.matches.pop(match.id, None)
+        for timer in match.timers.values():
+            timer.cancel()
+        match.timers.clear()
+        for spectator in match.spectators:
+            spectator.watching = None
+        match.spectators.clear()
+        for role, player in match.players.items():
+            self.sessions.pop(match.tokens[role], None)
+            self.ended[match.tokens[role]] = match.result
+            if len(self.ended) > ENDED_SESSIONS:
+                self.ended.popitem(last=False)
+            if player.match is match:
+                player.match = None
+                player.role = None
+
+
+async def serve(host="0.0.0.0", port=1234, server=None):
+    server = server or GameServer()
+    loop = asyncio.get_running_loop()
+    listener = await loop.create_server(lambda: Connection(server), host, port, backlog=4096)
+    return server, listener
+
+
+async def matchmaking_loop(server, interval=MATCHMAKING_TICK):
+    while True:
+        await asyncio.sleep(interval)
+        server.tick()
+
+
+async def run(host, port, record_path=None, ratings_path=None):
+    recorder = record.GameWriter(record_path) if record_path else None
+    matchmaker = matchmaking.Matchmaker(matchmaking.Ratings(ratings_path) if ratings_path else None)
+    server, listener = await serve(host, port, GameServer(recorder, matchmaker))
+    print(f"Сервер слушает {host}:{port}")
+    ticker = asyncio.create_task(matchmaking_loop(server))
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        ticker.cancel()
+        matchmaker.close()
+        if recorder is not None:
+            recorder.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сервер сетевой игры")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=1234)
+    parser.add_argument("--record", help="дописывать сыгранные партии в архив")
+    parser.add_argument("--ratings", help="файл SQLite с рейтингами (по умолчанию рейтинги живут до выхода)")
+    parser.add_argument("--metrics", help="включить замеры и дописывать их в файл JSON lines")
+    parser.add_argument("--metrics-interval", type=float, default=metrics.INTERVAL, help="как часто писать замеры, с")
+    args = parser.parse_args(argv)
+    if args.metrics:
+        metrics.start_dump(args.metrics, args.metrics_interval)
+    else:
+        metrics.from_environment()
+    try:
+        asyncio.run(run(args.host, args.port, args.record, args.ratings))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()